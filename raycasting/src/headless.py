@@ -0,0 +1,131 @@
+# src/headless.py
+
+import argparse
+import os
+import struct
+import time
+import zlib
+import moderngl
+import numpy as np
+from main import create_scene, WIDTH, HEIGHT
+
+
+class HeadlessWindow:
+    """
+    Reemplaza a Window en equipos sin pantalla: crea un contexto de ModernGL
+    independiente (o EGL) y dibuja la escena sobre un framebuffer fuera de pantalla.
+    """
+    def __init__(self, width, height, backend=None, require=330):
+        """
+        Crea el contexto sin ventana y el framebuffer donde se dibujan los frames.
+        """
+        options = {"backend": backend} if backend else {}
+        self.ctx = moderngl.create_standalone_context(require=require, **options)
+        self.width = width
+        self.height = height
+
+        # Framebuffer con color y profundidad que hace de "pantalla" virtual.
+        self.fbo = self.ctx.simple_framebuffer((width, height))
+        self.fbo.use()
+        self.scene = None
+
+    def set_scene(self, scene):
+        """Asigna la escena que se va a dibujar."""
+        self.scene = scene
+
+    def render_frame(self):
+        """Dibuja un frame igual que Window.on_draw y espera a que la GPU termine."""
+        self.fbo.use()
+        self.ctx.clear(0.08, 0.16, 0.18)
+        self.ctx.enable(moderngl.DEPTH_TEST)
+        self.scene.render()
+        self.ctx.finish()
+
+    def read_pixels(self):
+        """Devuelve el frame como un array (alto, ancho, 3) con la primera fila arriba."""
+        data = np.frombuffer(self.fbo.read(components=3), dtype=np.uint8)
+        return data.reshape(self.height, self.width, 3)[::-1]
+
+
+def write_image(path, pixels):
+    """
+    Guarda un array (alto, ancho, 3) como PNG, o como bytes RGB crudos si la extensión es .raw.
+    El archivo se arma entero en memoria y se escribe de una vez.
+    """
+    pixels = np.ascontiguousarray(pixels, dtype=np.uint8)
+    if path.endswith(".raw"):
+        data = pixels.tobytes()
+    else:
+        height, width = pixels.shape[:2]
+        # Cada fila del PNG empieza con un byte de filtro (0 = sin filtro).
+        rows = np.hstack([np.zeros((height, 1), dtype=np.uint8), pixels.reshape(height, -1)])
+        chunks = [(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+                  (b"IDAT", zlib.compress(rows.tobytes(), 6)),
+                  (b"IEND", b"")]
+        data = b"\x89PNG\r\n\x1a\n" + b"".join(
+            struct.pack(">I", len(body)) + tag + body + struct.pack(">I", zlib.crc32(tag + body))
+            for tag, body in chunks)
+    with open(path, "wb") as file:
+        file.write(data)
+
+
+def prepare_output(parser, output):
+    """Crea la carpeta de salida; si no se puede usar, termina con un error antes de renderizar."""
+    if not output:
+        return
+    try:
+        os.makedirs(output, exist_ok=True)
+    except OSError as error:
+        parser.error(f"No se puede crear la carpeta de salida '{output}': {error.strerror}")
+    if not os.access(output, os.W_OK):
+        parser.error(f"No se puede escribir en la carpeta de salida '{output}'")
+
+
+def save_frame(output, frame, image_format, pixels):
+    """Guarda el frame en la carpeta de salida; un error de escritura termina el programa con un mensaje."""
+    path = os.path.join(output, f"frame_{frame:04d}.{image_format}")
+    try:
+        write_image(path, pixels)
+    except OSError as error:
+        raise SystemExit(f"No se pudo guardar '{path}': {error.strerror}")
+
+
+def report(times, pixels_per_frame):
+    """Imprime el tiempo total y el rendimiento medio de la tanda."""
+    total = sum(times)
+    average = total / len(times)
+    print(f"Frames: {len(times)}  Total: {total:.3f} s  Promedio: {average * 1000:.2f} ms  "
+          f"FPS: {1.0 / average:.2f}  Píxeles/s: {pixels_per_frame / average:,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Renderiza la escena sin ventana y guarda los frames.")
+    parser.add_argument("--width", type=int, default=WIDTH)
+    parser.add_argument("--height", type=int, default=HEIGHT)
+    parser.add_argument("--frames", type=int, default=1)
+    parser.add_argument("--output", default="frames", help="Carpeta de salida; vacío para no guardar.")
+    parser.add_argument("--format", choices=["png", "raw"], default="png")
+    parser.add_argument("--backend", default=None, help="Backend de ModernGL, ej: egl.")
+    args = parser.parse_args()
+    if args.frames < 1:
+        parser.error("--frames tiene que ser al menos 1")
+    prepare_output(parser, args.output)
+
+    window = HeadlessWindow(args.width, args.height, args.backend)
+    window.set_scene(create_scene(window.ctx, args.width, args.height))
+
+    times = []
+    for frame in range(args.frames):
+        start = time.perf_counter()
+        window.render_frame()
+        times.append(time.perf_counter() - start)
+        print(f"Frame {frame}: {times[-1] * 1000:.2f} ms")
+
+        if args.output:
+            save_frame(args.output, frame, args.format, window.read_pixels())
+
+    report(times, args.width * args.height)
+
+
+if __name__ == "__main__":
+    main()
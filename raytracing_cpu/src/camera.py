@@ -1,4 +1,5 @@
 from ray import Ray
+import numpy as np
 import glm
 
 class Camera:
@@ -21,6 +22,13 @@ class Camera:
         point = pow(0.5 * (height + 1.0), 1.5)
         return (1.0 - point) * self.__sky_color_bottom + point * self.__sky_color_top
 
+    def get_sky_gradient_batch(self, heights):
+        """Versión vectorizada de get_sky_gradient: devuelve un color (N, 3) por cada altura."""
+        point = np.power(0.5 * (np.asarray(heights, dtype=np.float32) + 1.0), 1.5)[:, None]
+        bottom = np.array(self.__sky_color_bottom, dtype=np.float32)
+        top = np.array(self.__sky_color_top, dtype=np.float32)
+        return (1.0 - point) * bottom + point * top
+
     def get_view_matrix(self):
         """
         Calcula la matriz de vista (View Matrix).
@@ -28,6 +36,9 @@ class Camera:
         """
         # glm.lookAt construye la matriz a partir de dónde está la cámara, a dónde mira y cuál es su "arriba".
         return glm.lookAt(self.position, self.target, self.up)
+    
+    def get_inverse_view_matrix(self):
+        return glm.inverse(self.get_view_matrix())
 
     def get_perspective_matrix(self):
         """
@@ -52,12 +63,37 @@ class Camera:
         ray_dir_camera = glm.vec3(ndc_x, ndc_y, -1.0)
         
         # Transformar la dirección del rayo del espacio de la cámara al espacio del mundo.
-        view = self.get_view_matrix()
-        inv_view = glm.inverse(view)
+        inv_view = self.get_inverse_view_matrix()
         
         ray_dir_world = glm.normalize(glm.vec3(inv_view * glm.vec4(ray_dir_camera, 0.0)))
 
         # Crear y devolver el rayo final.
         return Ray(self.position, ray_dir_world)
-    
-    
\ No newline at end of file
+
+    def raycast_batch(self, width, height, tile=None):
+        """
+        Genera de una sola vez los rayos de todos los píxeles de la imagen, o solo los de un tile.
+        El tile es una tupla (x0, y0, x1, y1) con x1 e y1 excluidos. Devuelve dos arrays float32
+        de forma (N, 3) con los orígenes y las direcciones, recorriendo los píxeles fila por fila.
+        """
+        x0, y0, x1, y1 = tile if tile is not None else (0, 0, width, height)
+
+        # Mismas coordenadas (u, v) que usa raycast para cada píxel.
+        u = np.arange(x0, x1, dtype=np.float64) / (width - 1)
+        v = np.arange(y0, y1, dtype=np.float64) / (height - 1)
+        u, v = np.meshgrid(u, v)
+
+        fov_adjustment = np.tan(np.radians(self.fov) / 2)
+        ndc_x = ((2 * u - 1) * self.aspect * fov_adjustment).ravel()
+        ndc_y = ((2 * v - 1) * fov_adjustment).ravel()
+
+        # La matriz inversa de la vista se calcula una sola vez para todo el lote.
+        columns = np.array(self.get_inverse_view_matrix(), dtype=np.float64).T
+        directions = (ndc_x[:, None] * columns[0, :3]
+                      + ndc_y[:, None] * columns[1, :3]
+                      - columns[2, :3])
+        directions /= np.sqrt(np.sum(directions * directions, axis=1))[:, None]
+
+        origins = np.empty_like(directions, dtype=np.float32)
+        origins[:] = self.position
+        return origins, directions.astype(np.float32)
@@ -47,6 +47,11 @@ class Cube(Model):
         super().__init__(vertices, indices, colors, normals, texcoords)
 
 
+    @property
+    def hitbox(self):
+        return self.__colision
+
+
     def check_hit(self, origin, direction):
         return self.__colision.check_hit(origin, direction)
    
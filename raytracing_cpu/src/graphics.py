@@ -57,13 +57,19 @@ class Graphics:
 
         self.__vao.render()
         
-    def update_texture(self, texture_name, new_data):
+    def update_texture(self, texture_name, new_data, region=None):
         """
         Actualiza el contenido de una textura en la GPU con nuevos datos de la CPU.
+        Si se indica una región (x0, y0, x1, y1), solo se sube ese rectángulo.
         """
         if texture_name not in self.__textures: 
             raise ValueError(f"No existe la textura {texture_name}")
 
         texture_obj, texture_ctx = self.__textures[texture_name]
         texture_obj.update_data(new_data)
-        texture_ctx.write(texture_obj.get_bytes())
\ No newline at end of file
+        if region is None:
+            texture_ctx.write(texture_obj.get_bytes())
+        else:
+            x0, y0, x1, y1 = region
+            pixels = texture_obj.image_data.data[y0:y1, x0:x1]
+            texture_ctx.write(pixels.tobytes(), viewport=(x0, y0, x1 - x0, y1 - y0))
\ No newline at end of file
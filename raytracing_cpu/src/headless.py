@@ -0,0 +1,99 @@
+# src/headless.py
+
+import argparse
+import os
+import struct
+import time
+import zlib
+import numpy as np
+from main import create_camera, create_objects, WIDTH, HEIGHT
+from scene import RayScene
+
+
+def write_image(path, pixels):
+    """
+    Guarda un array (alto, ancho, 3) como PNG, o como bytes RGB crudos si la extensión es .raw.
+    El archivo se arma entero en memoria y se escribe de una vez.
+    """
+    pixels = np.ascontiguousarray(pixels, dtype=np.uint8)
+    if path.endswith(".raw"):
+        data = pixels.tobytes()
+    else:
+        height, width = pixels.shape[:2]
+        # Cada fila del PNG empieza con un byte de filtro (0 = sin filtro).
+        rows = np.hstack([np.zeros((height, 1), dtype=np.uint8), pixels.reshape(height, -1)])
+        chunks = [(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+                  (b"IDAT", zlib.compress(rows.tobytes(), 6)),
+                  (b"IEND", b"")]
+        data = b"\x89PNG\r\n\x1a\n" + b"".join(
+            struct.pack(">I", len(body)) + tag + body + struct.pack(">I", zlib.crc32(tag + body))
+            for tag, body in chunks)
+    with open(path, "wb") as file:
+        file.write(data)
+
+
+def prepare_output(parser, output):
+    """Crea la carpeta de salida; si no se puede usar, termina con un error antes de renderizar."""
+    if not output:
+        return
+    try:
+        os.makedirs(output, exist_ok=True)
+    except OSError as error:
+        parser.error(f"No se puede crear la carpeta de salida '{output}': {error.strerror}")
+    if not os.access(output, os.W_OK):
+        parser.error(f"No se puede escribir en la carpeta de salida '{output}'")
+
+
+def save_frame(output, frame, image_format, pixels):
+    """Guarda el frame en la carpeta de salida; un error de escritura termina el programa con un mensaje."""
+    path = os.path.join(output, f"frame_{frame:04d}.{image_format}")
+    try:
+        write_image(path, pixels)
+    except OSError as error:
+        raise SystemExit(f"No se pudo guardar '{path}': {error.strerror}")
+
+
+def report(times, pixels_per_frame):
+    """Imprime el tiempo total y el rendimiento medio de la tanda."""
+    total = sum(times)
+    average = total / len(times)
+    print(f"Frames: {len(times)}  Total: {total:.3f} s  Promedio: {average * 1000:.2f} ms  "
+          f"FPS: {1.0 / average:.2f}  Rayos/s: {pixels_per_frame / average:,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Renderiza la escena por CPU sin ventana ni OpenGL.")
+    parser.add_argument("--width", type=int, default=WIDTH)
+    parser.add_argument("--height", type=int, default=HEIGHT)
+    parser.add_argument("--frames", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=0, help="Procesos para el render por tiles.")
+    parser.add_argument("--output", default="frames", help="Carpeta de salida; vacío para no guardar.")
+    parser.add_argument("--format", choices=["png", "raw"], default="png")
+    args = parser.parse_args()
+    if args.frames < 1:
+        parser.error("--frames tiene que ser al menos 1")
+    prepare_output(parser, args.output)
+
+    # La RayScene se usa sin contexto: solo se necesitan sus objetos, su animación y su raytracer.
+    scene = RayScene(None, create_camera(args.width, args.height), args.width, args.height, args.workers)
+    scene.objects.extend(create_objects())
+
+    times = []
+    try:
+        for frame in range(args.frames):
+            start = time.perf_counter()
+            scene.raytracer.render_frame(scene.objects)
+            times.append(time.perf_counter() - start)
+            print(f"Frame {frame}: {times[-1] * 1000:.2f} ms")
+
+            if args.output:
+                # La fila 0 del framebuffer es la de abajo de la imagen.
+                save_frame(args.output, frame, args.format, scene.raytracer.get_texture().data[::-1])
+            scene.update()
+    finally:
+        scene.raytracer.close()
+    report(times, args.width * args.height)
+
+
+if __name__ == "__main__":
+    main()
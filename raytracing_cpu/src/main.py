@@ -1,42 +1,58 @@
 # src/main.py
 
-from window import Window
 from texture import Texture
 from material import Material
 from shader_program import ShaderProgram
 from cube import Cube
 from quad import Quad
 from camera import Camera
-from scene import Scene, RayScene
+from scene import RayScene
 
 WIDTH, HEIGHT = 800, 600
 
-# 1. Ventana
-window = Window(WIDTH, HEIGHT, "Raytracer por CPU")
 
-# 2. Shaders
-shader_program = ShaderProgram(window.ctx, 'shaders/basic.vert', 'shaders/basic.frag')
-shader_program_skybox = ShaderProgram(window.ctx, 'shaders/sprite.vert', 'shaders/sprite.frag')
+def create_camera(width, height):
+    return Camera((0, 0, 20), (0, 0, 0), (0, 1, 0), 45, width / height, 0.1, 100.0)
 
-# 3. Textura y Materiales
-skybox_texture = Texture(width=WIDTH, height=HEIGHT, channels_amount=3, color=(0, 0, 0))
-material = Material(shader_program)
-material_sprite = Material(shader_program_skybox, textures_data=[skybox_texture])
 
-# 4. Objetos
-cube1 = Cube((-2, 0, 2), (0, 45, 0), (1, 1, 1), name="Cube1")
-cube2 = Cube((2, 0, 2), (0, 45, 0), (1, 1, 1), name="Cube2")
-quad = Quad((0,0,0), (0,0,0), (6, 5, 1), name="Sprite", hittable=False)
+def create_objects():
+    """Crea los objetos de la escena. No necesitan contexto de OpenGL."""
+    cube1 = Cube((-2, 0, 2), (0, 45, 0), (1, 1, 1), name="Cube1")
+    cube2 = Cube((2, 0, 2), (0, 45, 0), (1, 1, 1), name="Cube2")
+    quad = Quad((0,0,0), (0,0,0), (6, 5, 1), name="Sprite", hittable=False)
+    return quad, cube1, cube2
 
-# 5. Cámara y Escena
-camera = Camera((0, 0, 20), (0, 0, 0), (0, 1, 0), 45, window.width / window.height, 0.1, 100.0)
-scene = RayScene(window.ctx, camera, WIDTH, HEIGHT)
 
-# 6. Añadir objetos a la escena
-scene.add_object(quad, material_sprite)
-scene.add_object(cube1, material)
-scene.add_object(cube2, material)
+def create_scene(ctx, width, height, workers=0, progressive=True):
+    """Arma la escena completa sobre un contexto de ModernGL ya creado."""
+    # 2. Shaders
+    shader_program = ShaderProgram(ctx, 'shaders/basic.vert', 'shaders/basic.frag')
+    shader_program_skybox = ShaderProgram(ctx, 'shaders/sprite.vert', 'shaders/sprite.frag')
 
-# 7. Ejecución
-window.set_scene(scene)
-window.run()
\ No newline at end of file
+    # 3. Textura y Materiales
+    skybox_texture = Texture(width=width, height=height, channels_amount=3, color=(0, 0, 0))
+    material = Material(shader_program)
+    material_sprite = Material(shader_program_skybox, textures_data=[skybox_texture])
+
+    # 4. Objetos
+    quad, cube1, cube2 = create_objects()
+
+    # 5. Cámara y Escena
+    scene = RayScene(ctx, create_camera(width, height), width, height, workers, progressive)
+
+    # 6. Añadir objetos a la escena
+    scene.add_object(quad, material_sprite)
+    scene.add_object(cube1, material)
+    scene.add_object(cube2, material)
+    return scene
+
+
+if __name__ == "__main__":
+    from window import Window
+
+    # 1. Ventana
+    window = Window(WIDTH, HEIGHT, "Raytracer por CPU")
+
+    # 7. Ejecución
+    window.set_scene(create_scene(window.ctx, WIDTH, HEIGHT))
+    window.run()
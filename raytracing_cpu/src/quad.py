@@ -53,6 +53,11 @@ class Quad(Model):
         super().__init__(vertices, indices, colors= colors, texcoords=texcoords, normals=normals)
 
 
+    @property
+    def hitbox(self):
+        return self.__colision
+
+
     def check_hit(self, origin, direction):
         return self.__colision.check_hit(origin, direction)
    
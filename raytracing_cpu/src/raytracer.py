@@ -1,34 +1,109 @@
 # src/raytracer.py
 
-from texture import Texture
+from texture import Texture, ImageData
+from hit import pack_hitboxes, check_hit_batch
+import numpy as np
+import multiprocessing
+
+# Buffer compartido del framebuffer visto desde cada proceso del pool.
+_worker_image = None
+
+
+def _init_worker(buffer, shape):
+    global _worker_image
+    _worker_image = np.frombuffer(buffer, dtype=np.uint8).reshape(shape)
+
+
+def _shade(camera, origins, directions, inverse_models, hittable):
+    """Traza un lote de rayos y devuelve un color (N, 3) por rayo."""
+    hits, _, _ = check_hit_batch(origins, directions, inverse_models, hittable)
+    colors = camera.get_sky_gradient_batch(directions[:, 1])
+    colors[hits] = (255, 0, 0)  # Rojo para indicar colisión
+    return colors
+
+
+def _render_tile(camera, width, height, tile, inverse_models, hittable, image=None):
+    """Traza los píxeles de un tile y los escribe en la imagen (por defecto, la compartida del proceso)."""
+    image = _worker_image if image is None else image
+    x0, y0, x1, y1 = tile
+    origins, directions = camera.raycast_batch(width, height, tile)
+    colors = _shade(camera, origins, directions, inverse_models, hittable)
+    image[y0:y1, x0:x1] = colors.reshape(y1 - y0, x1 - x0, 3)
+
 
 class RayTracer:
     """Genera una imagen por CPU lanzando rayos a la escena."""
-    def __init__(self, camera, width, height):
+    def __init__(self, camera, width, height, workers=0, tile_size=64):
         self.camera = camera
         self.width = width
         self.height = height
-        self.framebuffer = Texture(width=width, height=height, channels_amount=3)
+        self.workers = workers
+        self.tile_size = tile_size
+        self.__pool = None
+
+        # Con varios procesos, el framebuffer vive en memoria compartida para que
+        # cada worker escriba sus tiles directamente sobre ImageData.data.
+        self.__buffer = multiprocessing.RawArray('B', width * height * 3) if workers > 1 else None
+        image_data = ImageData(height, width, 3, buffer=self.__buffer)
+        self.framebuffer = Texture(width=width, height=height, channels_amount=3, image_data=image_data)
 
         self.camera.set_sky_colors(top=(16, 150, 222), bottom=(181, 224, 247))
 
     def trace_ray(self, ray, objects):
         """Lanza un único rayo y determina su color."""
-        for obj in objects:
-            if obj.check_hit(ray.origin, ray.direction):
-                return (255, 0, 0)  # Rojo para indicar colisión
-        height = ray.direction.y
-        return self.camera.get_sky_gradient(height)
+        colors = self.trace_rays(np.array([ray.origin]), np.array([ray.direction]), objects)
+        return colors[0]
+
+    def trace_rays(self, origins, directions, objects):
+        """Lanza un lote de rayos contra todos los objetos a la vez y devuelve un color (N, 3) por rayo."""
+        inverse_models, hittable = pack_hitboxes([obj.hitbox for obj in objects])
+        return _shade(self.camera, origins, directions, inverse_models, hittable)
+
+    def tiles(self):
+        """Divide el framebuffer en tiles (x0, y0, x1, y1) de tile_size píxeles de lado."""
+        for y in range(0, self.height, self.tile_size):
+            for x in range(0, self.width, self.tile_size):
+                yield (x, y, min(x + self.tile_size, self.width), min(y + self.tile_size, self.height))
+
+    def render_tile(self, tile, inverse_models, hittable):
+        """Traza un único tile sobre el framebuffer a partir de las hitboxes empaquetadas."""
+        _render_tile(self.camera, self.width, self.height, tile, inverse_models, hittable,
+                     self.framebuffer.image_data.data)
+
+    def render_preview(self, objects, step=8):
+        """
+        Genera una vista previa rápida trazando un solo rayo por cada bloque de step x step
+        píxeles y replicando su color en todo el bloque.
+        """
+        inverse_models, hittable = pack_hitboxes([obj.hitbox for obj in objects])
+        width, height = -(-self.width // step), -(-self.height // step)
+        origins, directions = self.camera.raycast_batch(width, height)
+        colors = _shade(self.camera, origins, directions, inverse_models, hittable).reshape(height, width, 3)
+        colors = colors.repeat(step, axis=0).repeat(step, axis=1)
+        self.framebuffer.set_region(0, 0, colors[:self.height, :self.width])
 
     def render_frame(self, objects):
-        """Recorre cada píxel de la pantalla para generar la imagen completa."""
-        for y in range(self.height):
-            for x in range(self.width):
-                u = x / (self.width - 1)
-                v = y / (self.height - 1)
-                ray = self.camera.raycast(u, v)
-                color = self.trace_ray(ray, objects)
-                self.framebuffer.set_pixel(x, y, color)
+        """Recorre cada tile de la pantalla para generar la imagen completa."""
+        inverse_models, hittable = pack_hitboxes([obj.hitbox for obj in objects])
+
+        if self.__buffer is None:
+            for tile in self.tiles():
+                self.render_tile(tile, inverse_models, hittable)
+            return
+
+        # Modo paralelo: los mismos tiles se reparten entre los procesos del pool.
+        if self.__pool is None:
+            self.__pool = multiprocessing.Pool(self.workers, initializer=_init_worker,
+                                               initargs=(self.__buffer, (self.height, self.width, 3)))
+        tasks = [(self.camera, self.width, self.height, tile, inverse_models, hittable) for tile in self.tiles()]
+        self.__pool.starmap(_render_tile, tasks)
+
+    def close(self):
+        """Libera el pool de procesos del modo paralelo."""
+        if self.__pool is not None:
+            self.__pool.close()
+            self.__pool.join()
+            self.__pool = None
     
     def get_texture(self):
         """Devuelve los datos de la imagen renderizada."""
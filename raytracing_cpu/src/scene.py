@@ -2,8 +2,10 @@
 
 from graphics import Graphics
 from raytracer import RayTracer
+from hit import pack_hitboxes, check_hit_batch
 import glm
 import math
+import numpy as np
 
 class Scene:
     """
@@ -31,32 +33,41 @@ class Scene:
         self.objects.append(model)
         self.graphics[model.name] = Graphics(self.ctx, model, material)
 
-    def render(self):
-        """
-        En un único bucle, actualiza la animación de los objetos y renderiza por GPU
-        aquellos que tienen un componente gráfico.
-        """
-        
+    def update(self):
+        """Avanza la animación de los objetos. No necesita contexto de OpenGL."""
         # Incrementa el tiempo para que la animación avance.
         self.time += 0.01
 
-        # Itera sobre todos los objetos de la escena.
         for obj in self.objects:
             if (obj.name != "Sprite"):
                 obj.rotation += glm.vec3(0.8, 0.6, 0.4)
                 obj.position.x += math.sin(self.time) * 0.01
 
+    def render(self):
+        """
+        Actualiza la animación de los objetos y renderiza por GPU
+        aquellos que tienen un componente gráfico.
+        """
+        self.update()
+
+        # Itera sobre todos los objetos de la escena.
+        for obj in self.objects:
             # Renderiza el objeto usando los atributos self.projection y self.view.
             model = obj.get_model_matrix()
             mvp = self.projection * self.view * model
             self.graphics[obj.name].render({'Mvp': mvp})
 
     def on_mouse_click(self, u, v):
-        """Maneja los clics para detectar colisiones."""
+        """
+        Maneja los clics para detectar colisiones. Informa solo el objeto golpeado más cercano
+        a la cámara: los que el rayo cruza detrás de él no se imprimen.
+        """
         ray = self.camera.raycast(u, v)
-        for obj in self.objects:
-            if obj.check_hit(ray.origin, ray.direction):
-                print(f"¡Golpeaste al objeto {obj.name}!")
+        inverse_models, hittable = pack_hitboxes([obj.hitbox for obj in self.objects])
+        hits, _, index = check_hit_batch(np.array([ray.origin]), np.array([ray.direction]),
+                                         inverse_models, hittable)
+        if hits[0]:
+            print(f"¡Golpeaste al objeto {self.objects[index[0]].name}!")
     
     def on_resize(self, width, height):
         """Ajusta la cámara y el viewport al cambiar el tamaño de la ventana."""
@@ -67,23 +78,61 @@ class Scene:
 
 
 class RayScene(Scene):
-    def __init__(self, ctx, camera, width, height):
+    def __init__(self, ctx, camera, width, height, workers=0, progressive=False, tiles_per_frame=4):
         super().__init__(ctx, camera)
-        self.raytracer = RayTracer(camera, width, height)
+        self.raytracer = RayTracer(camera, width, height, workers)
+        self.progressive = progressive
+        self.tiles_per_frame = tiles_per_frame
+        self.__pending_tiles = []
+        self.__snapshot = None
 
     def start(self):
+        if self.progressive:
+            self.start_progressive()
+            return
+
         print("RayScene: Renderizando frame en CPU... (puede tardar)")
         self.raytracer.render_frame(self.objects)
         if "Sprite" in self.graphics:
             self.graphics["Sprite"].update_texture("u_texture", self.raytracer.get_texture())
         print("RayScene: Renderizado completo.")
 
+    def start_progressive(self):
+        """
+        Muestra una vista previa de baja resolución y deja en cola los tiles del frame,
+        que se irán trazando de a poco en cada llamada a render.
+        """
+        print("RayScene: Renderizado progresivo en CPU...")
+        # Las transformaciones se fijan al empezar para que todos los tiles vean la misma escena.
+        self.__snapshot = pack_hitboxes([obj.hitbox for obj in self.objects])
+        self.__pending_tiles = list(self.raytracer.tiles())
+        self.__pending_tiles.reverse()
+
+        self.raytracer.render_preview(self.objects)
+        if "Sprite" in self.graphics:
+            self.graphics["Sprite"].update_texture("u_texture", self.raytracer.get_texture())
+
+    def refine(self):
+        """Traza los siguientes tiles pendientes y sube a la GPU solo las regiones terminadas."""
+        for _ in range(min(self.tiles_per_frame, len(self.__pending_tiles))):
+            tile = self.__pending_tiles.pop()
+            self.raytracer.render_tile(tile, *self.__snapshot)
+            if "Sprite" in self.graphics:
+                self.graphics["Sprite"].update_texture("u_texture", self.raytracer.get_texture(), region=tile)
+
+        if not self.__pending_tiles:
+            self.__snapshot = None
+            print("RayScene: Renderizado completo.")
+
     def render(self):
+        if self.__pending_tiles:
+            self.refine()
         # Delega a la clase padre para dibujar el Quad y animar los cubos.
         super().render()
 
     def on_resize(self, width, height):
         # Re-renderiza la escena en la CPU si la ventana cambia de tamaño.
         super().on_resize(width, height)
-        self.raytracer = RayTracer(self.camera, width, height)
+        self.raytracer.close()
+        self.raytracer = RayTracer(self.camera, width, height, self.raytracer.workers)
         self.start()
\ No newline at end of file
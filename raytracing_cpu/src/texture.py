@@ -5,12 +5,21 @@ import numpy as np
 # La clase ImageData no tiene atributos privados, no cambia.
 class ImageData:
     """Contenedor para los píxeles de una imagen en la memoria de la CPU."""
-    def __init__(self, height, width, channels, color=(0,0,0)):
-        self.data = np.full((height, width, channels), color, dtype=np.uint8)
+    def __init__(self, height, width, channels, color=(0,0,0), buffer=None):
+        # Si se recibe un buffer (ej: memoria compartida), los píxeles se guardan sobre él.
+        if buffer is not None:
+            self.data = np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, channels)
+            self.data[:] = color
+        else:
+            self.data = np.full((height, width, channels), color, dtype=np.uint8)
 
     def set_pixel(self, x, y, color):
         self.data[y, x] = color
 
+    def set_region(self, x, y, colors):
+        height, width = colors.shape[:2]
+        self.data[y:y + height, x:x + width] = colors
+
     def tobytes(self):
         return self.data.tobytes()
 
@@ -40,6 +49,9 @@ class Texture:
         
     def set_pixel(self, x, y, color):
         self._image_data.set_pixel(x, y, color)
+
+    def set_region(self, x, y, colors):
+        self._image_data.set_region(x, y, colors)
         
     def get_bytes(self):
         return self._image_data.tobytes()
\ No newline at end of file
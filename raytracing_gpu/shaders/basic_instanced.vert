@@ -0,0 +1,15 @@
+#version 330
+
+in vec3 in_pos;
+in vec3 in_color;
+// Matriz de modelo de cada instancia (avanza una vez por instancia, no por vértice).
+in mat4 in_model;
+
+out vec3 v_color;
+
+uniform mat4 ViewProjection;
+
+void main() {
+    gl_Position = ViewProjection * in_model * vec4(in_pos, 1.0);
+    v_color = in_color;
+}
@@ -1,10 +1,15 @@
 #version 330
 
 uniform sampler2D u_texture;
+// Fracción de la textura que tiene imagen (resolución dinámica del raytracer por GPU).
+uniform vec2 u_uv_scale = vec2(1.0);
 in vec2 v_uv;
 
 out vec4 f_color;
 
 void main() {
-    f_color = texture(u_texture, v_uv);
+    // Se evita muestrear medio texel fuera de la región con imagen.
+    vec2 texel = 0.5 / vec2(textureSize(u_texture, 0));
+    vec2 uv = clamp(v_uv * u_uv_scale, texel, u_uv_scale - texel);
+    f_color = texture(u_texture, uv);
 }
\ No newline at end of file
@@ -0,0 +1,287 @@
+# src/benchmark.py
+#
+# Benchmarks reproducibles de los caminos críticos del trazado de rayos.
+# Se ejecuta sin ventana desde la carpeta raytracing_gpu:
+#
+#     python src/benchmark.py --output resultados.json
+#     python src/benchmark.py --quick --compare resultados.json
+
+import argparse
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+import glm
+import numpy as np
+from bvh import BVH, PackedBVH
+from camera import Camera
+from cube import Cube
+from quad import Quad
+from hit import pack_hitboxes, check_hit_batch
+from raytracer import RayTracer
+
+
+SEED = 1234
+
+
+def measure(function, repeat):
+    """Ejecuta la función varias veces y devuelve la mediana y el mínimo en milisegundos."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000.0)
+    return {"median_ms": statistics.median(times), "min_ms": min(times)}
+
+
+def measure_allocations(function):
+    """Ejecuta la función una vez con tracemalloc y devuelve el pico de memoria y la cantidad de bloques reservados."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    function()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    blocks = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, "lineno"))
+    return {"alloc_peak_kb": peak / 1024.0, "alloc_blocks": blocks}
+
+
+def random_cubes(count, rng):
+    """Crea cubos con transformaciones aleatorias delante de la cámara."""
+    positions = rng.uniform((-8, -6, -10), (8, 6, 2), size=(count, 3))
+    rotations = rng.uniform(0, 360, size=(count, 3))
+    scales = rng.uniform(0.2, 1.0, size=(count, 3))
+    return [Cube(tuple(p), tuple(r), tuple(s), name=f"Cube{i}")
+            for i, (p, r, s) in enumerate(zip(positions, rotations, scales))]
+
+
+def random_primitives(count, rng):
+    """Crea AABBs aleatorias con el mismo formato que las primitivas que Scene le pasa al BVH."""
+    centers = rng.uniform(-100, 100, size=(count, 3))
+    extents = rng.uniform(0.1, 2.0, size=(count, 3))
+    return [{"aabb_min": glm.vec3(*(c - e)), "aabb_max": glm.vec3(*(c + e))}
+            for c, e in zip(centers, extents)]
+
+
+def bench_render_frame(resolutions, object_counts, repeat):
+    results = []
+    for count in object_counts:
+        objects = random_cubes(count, np.random.default_rng(SEED))
+        for width, height in resolutions:
+            camera = Camera((0, 0, 15), (0, 0, 0), (0, 1, 0), 45, width / height, 0.1, 100.0)
+            tracer = RayTracer(camera, width, height)
+            timing = measure(lambda: tracer.render_frame(objects), repeat)
+            timing["rays_per_sec"] = width * height / (timing["median_ms"] / 1000.0)
+            timing.update(measure_allocations(lambda: tracer.render_frame(objects)))
+            results.append({"name": "render_frame", "params": {"width": width, "height": height, "objects": count}, **timing})
+    return results
+
+
+def bench_bvh(primitive_counts, repeat, strategies=BVH.STRATEGIES):
+    results = []
+    for count in primitive_counts:
+        primitives = random_primitives(count, np.random.default_rng(SEED))
+        for strategy in strategies:
+            bvh = BVH(primitives, strategy)
+            build = measure(lambda: BVH(primitives, strategy), repeat)
+            pack = measure(bvh.pack_to_bytes, repeat)
+            params = {"primitives": count, "strategy": strategy}
+            results.append({"name": "bvh_build", "params": params, "build_ms": build["median_ms"],
+                            "sah_cost": bvh.sah_cost(), **build,
+                            **measure_allocations(lambda: BVH(primitives, strategy))})
+            results.append({"name": "bvh_pack_to_bytes", "params": params,
+                            **pack, **measure_allocations(bvh.pack_to_bytes)})
+
+        # El mismo corte por mediana, construido sobre arrays (N, 3) con PackedBVH.
+        aabb_min = np.array([p["aabb_min"].to_list() for p in primitives], dtype=np.float32)
+        aabb_max = np.array([p["aabb_max"].to_list() for p in primitives], dtype=np.float32)
+        bvh = PackedBVH(aabb_min, aabb_max)
+        build = measure(lambda: PackedBVH(aabb_min, aabb_max), repeat)
+        params = {"primitives": count, "strategy": "array"}
+        results.append({"name": "bvh_build", "params": params, "build_ms": build["median_ms"],
+                        "sah_cost": bvh.sah_cost(), **build,
+                        **measure_allocations(lambda: PackedBVH(aabb_min, aabb_max))})
+
+        # Refit con el 1% de las primitivas desplazadas, como en un frame animado.
+        moved = np.random.default_rng(SEED).choice(count, max(count // 100, 1), replace=False)
+        shifted_min, shifted_max = aabb_min.copy(), aabb_max.copy()
+        shifted_min[moved] += 0.5
+        shifted_max[moved] += 0.5
+        refit = measure(lambda: bvh.refit(shifted_min, shifted_max, moved), repeat)
+        results.append({"name": "bvh_refit", "params": {"primitives": count, "moved": len(moved)},
+                        "degradation": bvh.degradation(), **refit})
+    return results
+
+
+def bench_check_hit(ray_count, repeat):
+    rng = np.random.default_rng(SEED)
+    cube = Cube((0, 0, 0), (30, 45, 10), (1, 2, 1))
+    origins = np.zeros((ray_count, 3), dtype=np.float32) + (0, 0, 15)
+    directions = rng.normal(size=(ray_count, 3)).astype(np.float32) * (0.1, 0.1, 1) - (0, 0, 1)
+    rays = [(glm.vec3(*o), glm.vec3(*d)) for o, d in zip(origins, directions)]
+
+    def scalar():
+        for origin, direction in rays:
+            cube.check_hit(origin, direction)
+
+    single = measure(scalar, repeat)
+    single["rays_per_sec"] = ray_count / (single["median_ms"] / 1000.0)
+    batch = measure(lambda: check_hit_batch(origins, directions, *pack_hitboxes([cube.hitbox])), repeat)
+    batch["rays_per_sec"] = ray_count / (batch["median_ms"] / 1000.0)
+    return [{"name": "check_hit", "params": {"rays": ray_count}, **single},
+            {"name": "check_hit_batch", "params": {"rays": ray_count}, **batch}]
+
+
+def bench_update_matrix(object_counts, repeat, backend):
+    """Mide RaySceneGPU._update_matrix; necesita un contexto de OpenGL 4.3 sin ventana."""
+    import moderngl
+    from material import Material, StandardMaterial
+    from scene import RaySceneGPU
+    from shader_program import ShaderProgram
+    from texture import Texture
+
+    options = {"backend": backend} if backend else {}
+    ctx = moderngl.create_standalone_context(require=430, **options)
+    shader = ShaderProgram(ctx, 'shaders/basic.vert', 'shaders/basic.frag')
+    shader_sprite = ShaderProgram(ctx, 'shaders/sprite.vert', 'shaders/sprite.frag')
+
+    results = []
+    for count in object_counts:
+        width, height = 64, 64
+        camera = Camera((0, 0, 15), (0, 0, 0), (0, 1, 0), 45, width / height, 0.1, 100.0)
+        sprite = Quad(name="Sprite", animated=False, hittable=False)
+        sprite_texture = Texture(width=width, height=height, channels_amount=4, color=(255, 255, 255, 255))
+        scene = RaySceneGPU(ctx, camera, width, height, sprite, Material(shader_sprite, textures_data=[sprite_texture]))
+
+        material = StandardMaterial(shader, Texture("u_texture", 1, 1, 3, None, (200, 10, 190)))
+        for cube in random_cubes(count, np.random.default_rng(SEED)):
+            scene.add_object(cube, material)
+        scene.start()
+
+        # Todos los cubos se animan, así que cada llamada recalcula todos los slots.
+        def moving():
+            scene.update()
+            scene._update_matrix()
+
+        timing = measure(moving, repeat)
+        timing["objects_per_sec"] = count / (timing["median_ms"] / 1000.0)
+        timing.update(measure_allocations(moving))
+        results.append({"name": "update_matrix", "params": {"objects": count}, **timing})
+
+        # Sin movimiento solo se comparan los valores de posición, rotación y escala.
+        static = measure(scene._update_matrix, repeat)
+        results.append({"name": "update_matrix_static", "params": {"objects": count}, **static})
+    ctx.release()
+    return results
+
+
+def bench_raster(object_counts, repeat, backend):
+    """Mide Scene.render con cubos animados, dibujados uno por uno y con instancias."""
+    import moderngl
+    from material import StandardMaterial
+    from resource_cache import get_resource_cache
+    from scene import Scene
+    from shader_program import ShaderProgram
+    from texture import Texture
+
+    options = {"backend": backend} if backend else {}
+    ctx = moderngl.create_standalone_context(require=330, **options)
+    fbo = ctx.simple_framebuffer((320, 240))
+    fbo.use()
+    ctx.enable(moderngl.DEPTH_TEST)
+    shaders = {"single": ShaderProgram(ctx, 'shaders/basic.vert', 'shaders/basic.frag'),
+               "instanced": ShaderProgram(ctx, 'shaders/basic_instanced.vert', 'shaders/basic.frag')}
+
+    results = []
+    for count in object_counts:
+        for mode, shader in shaders.items():
+            camera = Camera((0, 0, 15), (0, 0, 0), (0, 1, 0), 45, 320 / 240, 0.1, 100.0)
+            scene = Scene(ctx, camera)
+            material = StandardMaterial(shader, Texture("u_texture", 1, 1, 3, None, (200, 10, 190)))
+            cubes = random_cubes(count, np.random.default_rng(SEED))
+            start = time.perf_counter()
+            for cube in cubes:
+                scene.add_object(cube, material)
+            build_ms = (time.perf_counter() - start) * 1000.0
+
+            def frame():
+                ctx.clear()
+                scene.render()
+                ctx.finish()
+
+            frame()
+            timing = measure(frame, repeat)
+            timing["fps"] = 1000.0 / timing["median_ms"]
+            timing["build_ms"] = build_ms
+            timing["gpu_kb"] = get_resource_cache(ctx).memory() / 1024.0
+            timing["culled"] = scene.stats["culled"]
+            results.append({"name": "raster_render", "params": {"objects": count, "mode": mode}, **timing})
+            for obj in list(scene.objects):
+                scene.remove_object(obj)
+    ctx.release()
+    return results
+
+
+def compare(results, previous_path):
+    """Imprime la relación entre la mediana de esta corrida y la de una corrida anterior."""
+    with open(previous_path) as file:
+        previous = {(r["name"], json.dumps(r["params"], sort_keys=True)): r for r in json.load(file)["results"]}
+
+    for result in results:
+        old = previous.get((result["name"], json.dumps(result["params"], sort_keys=True)))
+        if old is not None:
+            speedup = old["median_ms"] / result["median_ms"]
+            print(f"{result['name']:<20} {json.dumps(result['params']):<50} x{speedup:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de los caminos críticos del trazado de rayos.")
+    parser.add_argument("--output", default="benchmark.json", help="Archivo JSON de resultados.")
+    parser.add_argument("--compare", default=None, help="JSON de una corrida anterior para comparar.")
+    parser.add_argument("--quick", action="store_true", help="Tamaños reducidos para una corrida rápida.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--backend", default=None, help="Backend de ModernGL, ej: egl.")
+    parser.add_argument("--no-gpu", action="store_true", help="Omite los benchmarks que necesitan OpenGL.")
+    args = parser.parse_args()
+
+    if args.quick:
+        resolutions, object_counts = [(160, 120)], [2, 32]
+        primitive_counts, scene_counts, ray_count = [10, 100, 1000], [10, 100], 2000
+        raster_counts = [100, 1000]
+    else:
+        resolutions, object_counts = [(160, 120), (320, 240), (640, 480)], [2, 32, 256]
+        primitive_counts, scene_counts, ray_count = [10, 100, 1000, 10000, 100000], [10, 100, 1000], 20000
+        raster_counts = [100, 1000, 10000]
+
+    results = []
+    results += bench_render_frame(resolutions, object_counts, args.repeat)
+    results += bench_bvh(primitive_counts, args.repeat)
+    results += bench_check_hit(ray_count, args.repeat)
+    if not args.no_gpu:
+        try:
+            results += bench_update_matrix(scene_counts, args.repeat, args.backend)
+        except Exception as error:
+            print(f"Se omite update_matrix: no hay contexto de OpenGL 4.3 ({error})")
+        try:
+            results += bench_raster(raster_counts, args.repeat, args.backend)
+        except Exception as error:
+            print(f"Se omite raster_render: no hay contexto de OpenGL ({error})")
+
+    for result in results:
+        metrics = {k: round(v, 3) for k, v in result.items() if k not in ("name", "params")}
+        print(f"{result['name']:<20} {json.dumps(result['params']):<50} {metrics}")
+
+    meta = {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+            "seed": SEED, "repeat": args.repeat, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    with open(args.output, "w") as file:
+        json.dump({"meta": meta, "results": results}, file, indent=2)
+    print(f"Resultados guardados en {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
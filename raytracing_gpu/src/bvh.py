@@ -1,6 +1,12 @@
 import numpy as np
 
 
+def surface_area(aabb_min, aabb_max):
+    """Área de superficie de una o varias cajas (arrays (..., 3))."""
+    d = np.maximum(np.asarray(aabb_max) - np.asarray(aabb_min), 0.0)
+    return 2.0 * (d[..., 0] * d[..., 1] + d[..., 1] * d[..., 2] + d[..., 2] * d[..., 0])
+
+
 class BVHNode:
     def __init__(self, aabb_min=(0,0,0), aabb_max=(0,0,0), left=-1, right=-1, prim_start=-1, prim_count=0):
         self.aabb_min = tuple(aabb_min)
@@ -27,13 +33,27 @@ class BVHNode:
 
 
 class BVH:
-    def __init__(self, prims):
+    STRATEGIES = ("median", "sah")
+
+
+    def __init__(self, prims, strategy="median", bins=16):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"No existe la estrategia de construcción {strategy}")
         self.prims = prims
+        self.strategy = strategy
+        self.bins = bins
         self.nodes = []
         self.build()
 
 
     def build(self):
+        if self.strategy == "sah":
+            self.build_sah()
+        else:
+            self.build_median()
+
+
+    def build_median(self):
         indices = list(range(len(self.prims)))
 
 
@@ -83,8 +103,374 @@ class BVH:
         recurse(indices)
 
 
+    def build_sah(self):
+        """
+        Construye el árbol eligiendo cada corte con la heurística de área de superficie (SAH)
+        evaluada sobre 'bins' cubetas por eje. Los nodos resultantes tienen el mismo formato
+        que los del corte por mediana, así que pack_to_bytes no cambia.
+
+        Todos los nodos de un mismo nivel se evalúan juntos con NumPy (cubetas, cajas acumuladas
+        y partición), así el costo no depende de la cantidad de nodos sino de la de niveles.
+        Los nodos quedan numerados por nivel en lugar de en profundidad. Para comparar el tiempo
+        de construcción y el costo SAH contra build_median ver la salida del benchmark bvh_build.
+        """
+        n = len(self.prims)
+        if n == 0:
+            return
+        bins = self.bins
+        mins = np.array([p['aabb_min'] for p in self.prims], dtype=np.float64).reshape(-1, 3)
+        maxs = np.array([p['aabb_max'] for p in self.prims], dtype=np.float64).reshape(-1, 3)
+        centroids = (mins + maxs) * 0.5
+
+        count = 2 * n - 1
+        bounds = np.zeros((count, 6))
+        lefts = np.full(count, -1, dtype=np.int64)
+        rights = np.full(count, -1, dtype=np.int64)
+        primitives = np.full(count, -1, dtype=np.int64)
+
+        # Segmentos [start, start + size) de 'order' con las primitivas de cada nodo del nivel.
+        order = np.arange(n)
+        starts = np.array([0])
+        sizes = np.array([n])
+        node_ids = np.array([0])
+        next_node = 1
+
+        while len(starts):
+            # Posiciones en 'order' de todas las primitivas del nivel, segmento por segmento.
+            offsets = np.cumsum(sizes) - sizes
+            segment = np.repeat(np.arange(len(starts)), sizes)
+            local = np.arange(len(segment)) - offsets[segment]
+            positions = starts[segment] + local
+            prims = order[positions]
+            bounds[node_ids, 0:3] = np.minimum.reduceat(mins[prims], offsets)
+            bounds[node_ids, 3:6] = np.maximum.reduceat(maxs[prims], offsets)
+
+            leaf = sizes == 1
+            primitives[node_ids[leaf]] = prims[offsets[leaf]]
+            if leaf.all():
+                break
+
+            # Solo siguen los segmentos que se cortan.
+            keep = ~leaf[segment]
+            starts, sizes, node_ids = starts[~leaf], sizes[~leaf], node_ids[~leaf]
+            positions, prims = positions[keep], prims[keep]
+            offsets = np.cumsum(sizes) - sizes
+            segment = np.repeat(np.arange(len(starts)), sizes)
+            local = np.arange(len(segment)) - offsets[segment]
+            bin_ids, left_sizes, axis, split, valid = self.__split_sah(prims, segment, offsets, sizes,
+                                                                       mins, maxs, centroids)
+
+            # Partición estable dentro de cada segmento: las que van a la izquierda primero.
+            right = np.where(valid[segment],
+                             bin_ids[np.arange(len(prims)), axis[segment]] > split[segment],
+                             local >= (sizes // 2)[segment])
+            left_sizes = np.where(valid, left_sizes, sizes // 2)
+            order[positions] = prims[np.argsort(segment * 2 + right, kind='stable')]
+
+            left_ids = next_node + 2 * np.arange(len(starts))
+            next_node += 2 * len(starts)
+            lefts[node_ids] = left_ids
+            rights[node_ids] = left_ids + 1
+
+            starts = np.column_stack([starts, starts + left_sizes]).ravel()
+            sizes = np.column_stack([left_sizes, sizes - left_sizes]).ravel()
+            node_ids = np.column_stack([left_ids, left_ids + 1]).ravel()
+
+        for node_min, node_max, left, right, primitive in zip(bounds[:, 0:3].tolist(), bounds[:, 3:6].tolist(),
+                                                              lefts.tolist(), rights.tolist(), primitives.tolist()):
+            if primitive >= 0:
+                self.nodes.append(BVHNode(node_min, node_max, prim_start=primitive, prim_count=1))
+            else:
+                self.nodes.append(BVHNode(node_min, node_max, left, right))
+
+
+    def __split_sah(self, prims, segment, offsets, sizes, mins, maxs, centroids):
+        """
+        Corte binned de menor costo SAH para cada segmento del nivel, evaluando los tres ejes a la vez.
+        Devuelve la cubeta de cada primitiva en cada eje, cuántas primitivas quedan a la izquierda,
+        el eje y la cubeta del corte, y qué segmentos tienen un corte válido (si todos sus centroides coinciden se corta por la mitad).
+        """
+        bins = self.bins
+        segments = len(sizes)
+        c = centroids[prims]
+        c_min = np.minimum.reduceat(c, offsets)
+        extent = np.maximum.reduceat(c, offsets) - c_min
+        scale = np.divide(bins, extent, out=np.zeros_like(extent), where=extent > 0)
+
+        # Cubeta de cada primitiva en cada eje, y su posición en una tabla (segmentos, 3, bins).
+        bin_ids = np.minimum(((c - c_min[segment]) * scale[segment]).astype(np.int64), bins - 1)
+        flat_ids = ((segment[:, None] * 3 + np.arange(3)) * bins + bin_ids).ravel()
+
+        # Caja y cantidad de primitivas de cada cubeta (las vacías quedan con cajas invertidas).
+        # Se ordena por cubeta y se reduce cada tramo con reduceat.
+        counts = np.bincount(flat_ids, minlength=segments * 3 * bins).reshape(segments, 3, bins)
+        sorted_order = np.argsort(flat_ids, kind='stable')
+        sorted_ids = flat_ids[sorted_order]
+        first = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+        rows = prims[sorted_order // 3]
+        bin_min = np.full((segments * 3 * bins, 3), np.inf)
+        bin_max = np.full((segments * 3 * bins, 3), -np.inf)
+        bin_min[sorted_ids[first]] = np.minimum.reduceat(mins[rows], first)
+        bin_max[sorted_ids[first]] = np.maximum.reduceat(maxs[rows], first)
+        bin_min = bin_min.reshape(segments, 3, bins, 3)
+        bin_max = bin_max.reshape(segments, 3, bins, 3)
+
+        # Cajas acumuladas desde la izquierda y desde la derecha para cada plano de corte.
+        left_min = np.minimum.accumulate(bin_min, axis=2)[:, :, :-1]
+        left_max = np.maximum.accumulate(bin_max, axis=2)[:, :, :-1]
+        right_min = np.minimum.accumulate(bin_min[:, :, ::-1], axis=2)[:, :, ::-1][:, :, 1:]
+        right_max = np.maximum.accumulate(bin_max[:, :, ::-1], axis=2)[:, :, ::-1][:, :, 1:]
+        left_count = np.cumsum(counts, axis=2)[:, :, :-1]
+        right_count = sizes[:, None, None] - left_count
+
+        with np.errstate(invalid='ignore'):
+            cost = (surface_area(left_min, left_max) * left_count
+                    + surface_area(right_min, right_max) * right_count)
+        cost[(left_count == 0) | (right_count == 0)] = np.inf
+
+        cost = cost.reshape(segments, -1)
+        best = np.argmin(cost, axis=1)
+        valid = np.isfinite(cost[np.arange(segments), best])
+        axis, split = np.divmod(best, bins - 1)
+        left_sizes = left_count.reshape(segments, -1)[np.arange(segments), best]
+        return bin_ids, left_sizes, axis, split, valid
+
+
+    def sah_cost(self, traversal_cost=1.0, intersection_cost=1.0):
+        """
+        Costo SAH del árbol construido: suma del área de cada nodo relativa a la raíz,
+        ponderada por el costo de recorrerlo (internos) o de intersectar sus primitivas (hojas).
+        """
+        if not self.nodes:
+            return 0.0
+        bounds = np.array([[*n.aabb_min, *n.aabb_max] for n in self.nodes], dtype=np.float64)
+        areas = surface_area(bounds[:, :3], bounds[:, 3:])
+        counts = np.array([n.primitive_count for n in self.nodes], dtype=np.float64)
+        weights = np.where(counts > 0, counts * intersection_cost, traversal_cost)
+        root = areas[0] if areas[0] > 0 else 1.0
+        return float(np.sum(areas * weights) / root)
+
+
     def pack_to_bytes(self):
         floats = []
         for node in self.nodes:
             floats.extend(node.pack())
         return np.array(floats, dtype='f4').tobytes()
+
+
+class PackedBVH:
+    """
+    BVH construido directamente sobre arrays NumPy: recibe las cajas de las primitivas como
+    arrays (N, 3), parte listas de índices en el lugar nivel por nivel y escribe cada nodo
+    en un array float32 (2N - 1, 8) con el formato que espera el compute shader.
+    Usa el mismo corte por mediana en el eje más largo que BVH.build_median.
+
+    Para escenas animadas, refit() recalcula las cajas de abajo hacia arriba sin cambiar la
+    topología; degradation() indica cuánto empeoró el árbol desde la última construcción.
+
+    'ids' elige qué filas de aabb_min/aabb_max entran en el árbol (todas si es None); las hojas
+    guardan ese id, que es el índice con el que el shader lee las matrices del objeto.
+    """
+    def __init__(self, aabb_min, aabb_max, ids=None):
+        aabb_min = np.asarray(aabb_min, dtype=np.float32).reshape(-1, 3)
+        aabb_max = np.asarray(aabb_max, dtype=np.float32).reshape(-1, 3)
+        self.ids = np.arange(len(aabb_min)) if ids is None else np.asarray(ids, dtype=np.int64)
+        self.aabb_min = aabb_min[self.ids]
+        self.aabb_max = aabb_max[self.ids]
+        count = max(2 * len(self.ids) - 1, 0)
+        self.nodes = np.zeros((count, 8), dtype=np.float32)
+        self.indices = self.ids.copy()
+
+        # Posición de cada id dentro de las cajas del árbol (-1 si no está).
+        self.__positions = np.full(int(self.ids.max()) + 1 if len(self.ids) else 0, -1, dtype=np.int64)
+        self.__positions[self.ids] = np.arange(len(self.ids))
+
+        # Topología guardada para el refit: padre y profundidad de cada nodo, y hoja de cada primitiva.
+        self.parents = np.full(count, -1, dtype=np.int64)
+        self.depths = np.zeros(count, dtype=np.int64)
+        self.leaf_nodes = np.zeros(len(self.aabb_min), dtype=np.int64)
+        # Tramo [inicio, cantidad] de 'indices' con las primitivas de cada nodo.
+        self.ranges = np.zeros((count, 2), dtype=np.int64)
+        self.build()
+
+        # Suma de las áreas de todos los nodos: con costos 1 es el numerador de sah_cost().
+        self.__areas = surface_area(self.nodes[:, 0:3].astype(np.float64), self.nodes[:, 4:7])
+        self.__area_sum = float(self.__areas.sum())
+        self.build_cost = self.__current_cost()
+
+
+    def build(self):
+        n = len(self.aabb_min)
+        if n == 0:
+            return
+
+        # Una lista de primitivas por eje, ordenada por centroide. Las tres se parten igual en cada
+        # nivel, así cada segmento tiene las mismas primitivas en las tres y sigue ordenado por eje.
+        centroids = (self.aabb_min + self.aabb_max) * 0.5
+        lists = np.empty((3, n), dtype=np.int32)
+        for axis in range(3):
+            lists[axis] = np.argsort(centroids[:, axis], kind='stable')
+
+        # Buffers que se reusan en todos los niveles; 'bounds' sigue el orden de la lista del eje x.
+        partitioned = np.empty_like(lists)
+        flags = np.empty((3, n), dtype=bool)
+        before = np.empty((3, n), dtype=np.int32)
+        target = np.empty((3, n), dtype=np.int32)
+        is_left = np.empty(n, dtype=bool)
+        # Cada caja se guarda como [min.xyz, -max.xyz] para sacar las dos esquinas con un solo
+        # minimum.reduceat, y se mueve como un único registro de 24 bytes.
+        records = np.hstack([self.aabb_min, -self.aabb_max]).view(np.dtype((np.void, 24))).ravel()
+        bounds = records[lists[0]]
+        moved = np.empty_like(bounds)
+        columns = np.arange(n, dtype=np.int32)
+
+        # Segmentos contiguos de las listas que cubren todas las primitivas: [start, start + size).
+        starts = np.array([0])
+        sizes = np.array([n])
+        node_ids = np.array([0])
+        pending = np.array([True])
+        level_start, next_node = 0, 1
+
+        while pending.any():
+            # Los nodos pendientes de un nivel tienen índices consecutivos desde level_start.
+            level = slice(level_start, next_node)
+            order = lists[0]
+            corners = np.minimum.reduceat(bounds.view(np.float32).reshape(n, 6), starts)
+            node_min, node_max = corners[:, 0:3], -corners[:, 3:6]
+            self.nodes[level, 0:3] = node_min[pending]
+            self.nodes[level, 4:7] = node_max[pending]
+            self.ranges[level, 0] = starts[pending]
+            self.ranges[level, 1] = sizes[pending]
+
+            leaf = pending & (sizes == 1)
+            self.nodes[node_ids[leaf], 3] = -1.0
+            self.nodes[node_ids[leaf], 7] = self.ids[order[starts[leaf]]]
+            self.leaf_nodes[order[starts[leaf]]] = node_ids[leaf]
+
+            split = pending & (sizes > 1)
+            if not split.any():
+                break
+
+            # A la izquierda van las primitivas con rango menor al de la mediana en el eje más largo
+            # del segmento, que en la lista de ese eje son las primeras 'half'.
+            axis = np.argmax(node_max - node_min, axis=1)
+            half = np.where(split, sizes // 2, sizes)
+            segment = np.repeat(np.arange(len(starts)), sizes)
+            chosen = lists.ravel()[axis[segment] * n + columns]
+            is_left[chosen] = columns < (starts + half)[segment]
+
+            # Partición estable de las tres listas en O(n), todos los segmentos a la vez. Antes de
+            # cada segmento hay la misma cantidad de primitivas izquierdas en las tres listas (la
+            # suma de las mitades anteriores), así el destino de cada una sale de un solo cumsum:
+            # con f = 1 si va a la izquierda, destino = derecha - antes + f * (izquierda - derecha + 2 * antes).
+            lefts = np.cumsum(half)
+            right_offset = columns + lefts[segment]
+            gap = (starts - 2 * lefts + half)[segment] - columns
+            np.take(is_left, lists, out=flags)
+            np.cumsum(flags, axis=1, out=before)
+            before -= flags
+            np.multiply(before, 2, out=target)
+            target += gap
+            target *= flags
+            target += right_offset
+            target -= before
+            for k in range(3):
+                partitioned[k, target[k]] = lists[k]
+            moved[target[0]] = bounds
+            lists, partitioned = partitioned, lists
+            bounds, moved = moved, bounds
+
+            # Hijos: la primera mitad va a la izquierda y el resto a la derecha.
+            count = int(split.sum())
+            left_ids = next_node + 2 * np.arange(count)
+            level_start, next_node = next_node, next_node + 2 * count
+            self.nodes[node_ids[split], 3] = left_ids
+            self.nodes[node_ids[split], 7] = -(left_ids + 1) - 2
+            self.parents[left_ids] = self.parents[left_ids + 1] = node_ids[split]
+            self.depths[left_ids] = self.depths[left_ids + 1] = self.depths[node_ids[split]] + 1
+
+            child_starts = np.column_stack([starts, starts + half]).ravel()
+            child_sizes = np.column_stack([half, sizes - half]).ravel()
+            child_ids = np.column_stack([node_ids, node_ids]).ravel()
+            child_ids[0::2][split] = left_ids
+            child_ids[1::2][split] = left_ids + 1
+            child_pending = np.column_stack([split, split]).ravel()
+
+            keep = child_sizes > 0
+            starts, sizes = child_starts[keep], child_sizes[keep]
+            node_ids, pending = child_ids[keep], child_pending[keep]
+
+        self.indices = self.ids[lists[0]]
+
+
+    def refit(self, aabb_min, aabb_max, changed=None):
+        """
+        Actualiza las cajas de las primitivas con los ids de 'changed' (todas si es None) y
+        recalcula solo sus hojas y ancestros, de los más profundos a la raíz.
+        El costo depende de cuántas primitivas se movieron, no del tamaño de la escena.
+        Devuelve los índices de los nodos que cambiaron, para subir solo esas filas.
+        """
+        aabb_min = np.asarray(aabb_min, dtype=np.float32).reshape(-1, 3)
+        aabb_max = np.asarray(aabb_max, dtype=np.float32).reshape(-1, 3)
+        changed = self.ids if changed is None else np.asarray(changed, dtype=np.int64)
+        if len(changed) == 0:
+            return np.empty(0, dtype=np.int64)
+        positions = self.__positions[changed] if changed.max() < len(self.__positions) else np.array([-1])
+        if (positions < 0).any():
+            raise ValueError("El refit solo puede actualizar primitivas que ya están en el árbol.")
+
+        self.aabb_min[positions] = aabb_min[changed]
+        self.aabb_max[positions] = aabb_max[changed]
+        leaves = self.leaf_nodes[positions]
+        self.nodes[leaves, 0:3] = self.aabb_min[positions]
+        self.nodes[leaves, 4:7] = self.aabb_max[positions]
+
+        # Ancestros de las hojas movidas, sin repetir.
+        ancestors = []
+        current = self.parents[leaves]
+        while len(current):
+            current = np.unique(current[current >= 0])
+            ancestors.append(current)
+            current = self.parents[current]
+        ancestors = np.unique(np.concatenate(ancestors)) if ancestors else np.empty(0, dtype=np.int64)
+
+        # Un nivel a la vez, del más profundo a la raíz, para que los hijos ya estén al día.
+        ancestors = ancestors[np.argsort(-self.depths[ancestors], kind='stable')]
+        _, level_starts = np.unique(-self.depths[ancestors], return_index=True)
+        for level in np.split(ancestors, level_starts[1:]):
+            left = self.nodes[level, 3].astype(np.int64)
+            right = -self.nodes[level, 7].astype(np.int64) - 2
+            self.nodes[level, 0:3] = np.minimum(self.nodes[left, 0:3], self.nodes[right, 0:3])
+            self.nodes[level, 4:7] = np.maximum(self.nodes[left, 4:7], self.nodes[right, 4:7])
+
+        touched = np.concatenate([leaves, ancestors])
+        areas = surface_area(self.nodes[touched, 0:3].astype(np.float64), self.nodes[touched, 4:7])
+        self.__area_sum += float(areas.sum() - self.__areas[touched].sum())
+        self.__areas[touched] = areas
+        return np.sort(touched)
+
+
+    def degradation(self):
+        """Relación entre el costo SAH actual y el de la última construcción (1.0 = igual de bueno)."""
+        return self.__current_cost() / self.build_cost if self.build_cost > 0 else 1.0
+
+
+    def __current_cost(self):
+        if len(self.nodes) == 0:
+            return 0.0
+        root = self.__areas[0] if self.__areas[0] > 0 else 1.0
+        return float(self.__area_sum / root)
+
+
+    def sah_cost(self, traversal_cost=1.0, intersection_cost=1.0):
+        """Costo SAH del árbol, con la misma definición que BVH.sah_cost."""
+        if len(self.nodes) == 0:
+            return 0.0
+        areas = surface_area(self.nodes[:, 0:3].astype(np.float64), self.nodes[:, 4:7])
+        weights = np.where(self.nodes[:, 7] >= 0, intersection_cost, traversal_cost)
+        root = areas[0] if areas[0] > 0 else 1.0
+        return float(np.sum(areas * weights) / root)
+
+
+    def pack_to_bytes(self):
+        return self.nodes.tobytes()
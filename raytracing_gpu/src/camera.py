@@ -1,7 +1,13 @@
 from ray import Ray
+import numpy as np
 import glm
 
 class Camera:
+    """
+    Cámara con la vista, su inversa y la proyección guardadas en caché. Se recalculan solo
+    cuando cambia alguno de sus parámetros, y cada cambio incrementa 'version' para que el
+    raytracer y la escena suban sus uniforms únicamente cuando hace falta.
+    """
     def __init__(self, position, target, up, fov, aspect, near, far):
         self.position = glm.vec3(*position)
         self.target = glm.vec3(*target)
@@ -13,6 +19,36 @@ class Camera:
         self.__sky_color_top = None
         self.__sky_color_bottom = None
 
+        # Copia de los parámetros con los que se calcularon las matrices en caché.
+        # Se comparan por valor para detectar también cambios en el lugar (ej: position.x += 1).
+        self.__cached = None
+        self.__view = None
+        self.__inverse_view = None
+        self.__perspective = None
+        self.__version = 0
+
+    def __state(self):
+        return (glm.vec3(self.position), glm.vec3(self.target), glm.vec3(self.up),
+                self.fov, self.aspect, self.near, self.far)
+
+    def __update(self):
+        state = self.__state()
+        if state == self.__cached:
+            return
+        self.__cached = state
+        # glm.lookAt construye la matriz a partir de dónde está la cámara, a dónde mira y cuál es su "arriba".
+        self.__view = glm.lookAt(self.position, self.target, self.up)
+        self.__inverse_view = glm.inverse(self.__view)
+        # glm.perspective necesita el campo de visión (fov) en radianes.
+        self.__perspective = glm.perspective(glm.radians(self.fov), self.aspect, self.near, self.far)
+        self.__version += 1
+
+    @property
+    def version(self):
+        """Número que aumenta cada vez que cambia algún parámetro de la cámara."""
+        self.__update()
+        return self.__version
+
     def set_sky_colors(self, top, bottom):
         self.__sky_color_top = glm.vec3(*top)
         self.__sky_color_bottom = glm.vec3(*bottom)
@@ -21,24 +57,32 @@ class Camera:
         point = pow(0.5 * (height + 1.0), 1.5)
         return (1.0 - point) * self.__sky_color_bottom + point * self.__sky_color_top
 
+    def get_sky_gradient_batch(self, heights):
+        """Versión vectorizada de get_sky_gradient: devuelve un color (N, 3) por cada altura."""
+        point = np.power(0.5 * (np.asarray(heights, dtype=np.float32) + 1.0), 1.5)[:, None]
+        bottom = np.array(self.__sky_color_bottom, dtype=np.float32)
+        top = np.array(self.__sky_color_top, dtype=np.float32)
+        return (1.0 - point) * bottom + point * top
+
     def get_view_matrix(self):
         """
         Calcula la matriz de vista (View Matrix).
         Esta matriz define la posición y orientación de la cámara en el mundo.
         """
-        # glm.lookAt construye la matriz a partir de dónde está la cámara, a dónde mira y cuál es su "arriba".
-        return glm.lookAt(self.position, self.target, self.up)
+        self.__update()
+        return self.__view
     
     def get_inverse_view_matrix(self):
-        return glm.inverse(self.get_view_matrix())
+        self.__update()
+        return self.__inverse_view
 
     def get_perspective_matrix(self):
         """
         Calcula la matriz de proyección (Projection Matrix).
         Esta matriz crea la ilusión de profundidad y perspectiva.
         """
-        # glm.perspective necesita el campo de visión (fov) en radianes.
-        return glm.perspective(glm.radians(self.fov), self.aspect, self.near, self.far)
+        self.__update()
+        return self.__perspective
 
     def raycast(self, u, v):
         """
@@ -55,12 +99,37 @@ class Camera:
         ray_dir_camera = glm.vec3(ndc_x, ndc_y, -1.0)
         
         # Transformar la dirección del rayo del espacio de la cámara al espacio del mundo.
-        view = self.get_view_matrix()
-        inv_view = glm.inverse(view)
+        inv_view = self.get_inverse_view_matrix()
         
         ray_dir_world = glm.normalize(glm.vec3(inv_view * glm.vec4(ray_dir_camera, 0.0)))
 
         # Crear y devolver el rayo final.
         return Ray(self.position, ray_dir_world)
-    
-    
\ No newline at end of file
+
+    def raycast_batch(self, width, height, tile=None):
+        """
+        Genera de una sola vez los rayos de todos los píxeles de la imagen, o solo los de un tile.
+        El tile es una tupla (x0, y0, x1, y1) con x1 e y1 excluidos. Devuelve dos arrays float32
+        de forma (N, 3) con los orígenes y las direcciones, recorriendo los píxeles fila por fila.
+        """
+        x0, y0, x1, y1 = tile if tile is not None else (0, 0, width, height)
+
+        # Mismas coordenadas (u, v) que usa raycast para cada píxel.
+        u = np.arange(x0, x1, dtype=np.float64) / (width - 1)
+        v = np.arange(y0, y1, dtype=np.float64) / (height - 1)
+        u, v = np.meshgrid(u, v)
+
+        fov_adjustment = np.tan(np.radians(self.fov) / 2)
+        ndc_x = ((2 * u - 1) * self.aspect * fov_adjustment).ravel()
+        ndc_y = ((2 * v - 1) * fov_adjustment).ravel()
+
+        # La matriz inversa de la vista se calcula una sola vez para todo el lote.
+        columns = np.array(self.get_inverse_view_matrix(), dtype=np.float64).T
+        directions = (ndc_x[:, None] * columns[0, :3]
+                      + ndc_y[:, None] * columns[1, :3]
+                      - columns[2, :3])
+        directions /= np.sqrt(np.sum(directions * directions, axis=1))[:, None]
+
+        origins = np.empty_like(directions, dtype=np.float32)
+        origins[:] = self.position
+        return origins, directions.astype(np.float32)
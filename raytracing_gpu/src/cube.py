@@ -1,5 +1,6 @@
 from model import Model
 from hit import HitBoxOBB
+from transform import Transform, transform_aabbs
 import numpy as np
 import glm
 
@@ -8,10 +9,10 @@ class Cube(Model):
     def __init__(self, position=(0,0,0), rotation=(0,0,0), scale=(1,1,1), name="cube", animated = True, hittable=True):
         self.name = name
         self.animated = animated
-        self.position = glm.vec3(*position)
-        self.rotation = glm.vec3(*rotation)
-        self.scale = glm.vec3(*scale)
-        self.__colision = HitBoxOBB(get_model_matrix = lambda: self.get_model_matrix(), hittable=hittable)
+        self.transform = Transform(position, rotation, scale)
+        self.__colision = HitBoxOBB(get_model_matrix = self.transform.get_model_matrix,
+                                    get_inverse_model_matrix = self.transform.get_inverse_model_matrix,
+                                    hittable=hittable)
 
 
         vertices = np.array([
@@ -46,31 +47,47 @@ class Cube(Model):
 
 
         super().__init__(vertices, indices, colors, normals, texcoords) 
-        self.__vertices = vertices
 
 
     @property
     def aabb(self):
-        verts3 = self.__vertices.reshape(-1, 3)
+        local_min, local_max = self.local_bounds
+        model = np.array(self.get_model_matrix())
+        aabb_min, aabb_max = transform_aabbs(model[None], local_min[None], local_max[None])
+        return glm.vec3(*aabb_min[0]), glm.vec3(*aabb_max[0])
 
-        pts = [self.get_model_matrix() * glm.vec4(v[0], v[1], v[2], 1.0) for v in verts3]
-        xs = [p.x for p in pts]
-        ys = [p.y for p in pts]
-        zs = [p.z for p in pts]
-        return (glm.vec3(min(xs), min(ys), min(zs)),
-                 glm.vec3(max(xs), max(ys), max(zs)))
+
+    @property
+    def hitbox(self):
+        return self.__colision
 
 
     def check_hit(self, origin, direction):
         return self.__colision.check_hit(origin, direction)
    
+    @property
+    def position(self):
+        return self.transform.position
+
+    @position.setter
+    def position(self, value):
+        self.transform.position = value
+
+    @property
+    def rotation(self):
+        return self.transform.rotation
+
+    @rotation.setter
+    def rotation(self, value):
+        self.transform.rotation = value
+
+    @property
+    def scale(self):
+        return self.transform.scale
+
+    @scale.setter
+    def scale(self, value):
+        self.transform.scale = value
+
     def get_model_matrix(self):
-        model = glm.mat4(1)
-        model = glm.translate(model, self.position)
-        model = glm.rotate(model, glm.radians(self.rotation.x % 360), glm.vec3(1, 0, 0))
-        model = glm.rotate(model, glm.radians(self.rotation.y % 360), glm.vec3(0, 1, 0))
-        model = glm.rotate(model, glm.radians(self.rotation.z % 360), glm.vec3(0, 0, 1))
-        model = glm.scale(model, self.scale)
-        return model
-   
-   
+        return self.transform.get_model_matrix()
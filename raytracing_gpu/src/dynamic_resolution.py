@@ -0,0 +1,94 @@
+# src/dynamic_resolution.py
+
+import math
+import time
+
+
+class DispatchTimer:
+    """
+    Mide cuánto tarda el dispatch del compute shader. Usa queries de tiempo de la GPU si
+    el driver las soporta y, si no, el tiempo de CPU esperando a que la GPU termine.
+    Con queries alterna dos objetos y lee el del frame anterior, que ya suele estar listo.
+    """
+    def __init__(self, ctx):
+        self.ctx = ctx
+        try:
+            self.__queries = [ctx.query(time=True), ctx.query(time=True)]
+        except Exception:
+            self.__queries = None
+        self.gpu_queries = self.__queries is not None
+        self.__frame = 0
+        self.__pending = [False, False]
+        self.__start = 0.0
+        self.last_ms = None
+
+    def __enter__(self):
+        if self.gpu_queries:
+            self.__current = self.__frame % 2
+            self.__read(self.__current)
+            self.__queries[self.__current].__enter__()
+        else:
+            self.__start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.gpu_queries:
+            self.__queries[self.__current].__exit__(*exc)
+            self.__pending[self.__current] = True
+        else:
+            self.ctx.finish()
+            self.last_ms = (time.perf_counter() - self.__start) * 1000.0
+        self.__frame += 1
+        return False
+
+    def __read(self, index):
+        if self.__pending[index]:
+            self.last_ms = self.__queries[index].elapsed / 1e6
+            self.__pending[index] = False
+
+
+class ResolutionController:
+    """
+    Ajusta la escala de render (fracción del ancho y alto de la ventana) para que el
+    dispatch tarde alrededor de target_ms. Supone que el tiempo es proporcional a la
+    cantidad de píxeles, es decir a scale², suaviza la medición y solo cambia la escala
+    de a pasos de 'step' para no alterar la resolución en cada frame.
+    """
+    def __init__(self, target_ms, min_scale=0.25, max_scale=1.0, step=1.0 / 16, smoothing=0.2):
+        if target_ms <= 0:
+            raise ValueError("El tiempo objetivo del frame debe ser positivo.")
+        self.target_ms = target_ms
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.step = step
+        self.smoothing = smoothing
+        self.scale = max_scale
+        self.__average_ms = None
+
+    def update(self, frame_ms):
+        """Recibe el último tiempo medido y devuelve la escala para el próximo frame."""
+        if frame_ms is None or frame_ms <= 0:
+            return self.scale
+        if self.__average_ms is None:
+            self.__average_ms = frame_ms
+        else:
+            self.__average_ms += self.smoothing * (frame_ms - self.__average_ms)
+
+        # Escala que tardaría target_ms, redondeada hacia abajo al paso más cercano.
+        ideal = self.scale * math.sqrt(self.target_ms / self.__average_ms)
+        ideal = min(max(ideal, self.min_scale), self.max_scale)
+        steps = math.floor(ideal / self.step + 1e-6)
+        scale = min(max(steps * self.step, self.min_scale), self.max_scale)
+
+        # Histéresis: para subir se pide un paso entero de margen sobre la escala actual.
+        if scale > self.scale and ideal < self.scale + 2 * self.step:
+            return self.scale
+        if scale != self.scale:
+            # La medición suavizada pasa a la nueva escala para no corregir dos veces.
+            self.__average_ms *= (scale / self.scale) ** 2
+            self.scale = scale
+        return self.scale
+
+    def render_size(self, width, height):
+        """Tamaño en píxeles de la imagen trazada con la escala actual."""
+        return max(1, round(width * self.scale)), max(1, round(height * self.scale))
@@ -0,0 +1,111 @@
+# src/frustum.py
+
+import numpy as np
+from bvh import PackedBVH
+
+
+# Resultado de probar una caja contra el frustum.
+OUTSIDE, INTERSECTING, INSIDE = 0, 1, 2
+
+
+def frustum_planes(view_projection):
+    """
+    Los seis planos (izquierdo, derecho, abajo, arriba, cerca, lejos) de la matriz de
+    proyección * vista, como un array (6, 4) [nx, ny, nz, d] con la normal hacia adentro
+    y normalizada, así n·p + d es la distancia con signo del punto p al plano.
+    """
+    m = np.asarray(view_projection, dtype=np.float64)
+    planes = np.array([m[3] + m[0], m[3] - m[0],
+                       m[3] + m[1], m[3] - m[1],
+                       m[3] + m[2], m[3] - m[2]])
+    return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+
+def classify_aabbs(planes, aabb_min, aabb_max):
+    """
+    Clasifica cajas (N, 3) en OUTSIDE, INTERSECTING o INSIDE respecto de los planos.
+    Es conservadora: una caja que cruza las esquinas del frustum puede quedar como INTERSECTING.
+    """
+    aabb_min = np.asarray(aabb_min, dtype=np.float64)
+    aabb_max = np.asarray(aabb_max, dtype=np.float64)
+    center = (aabb_min + aabb_max) * 0.5
+    extent = (aabb_max - aabb_min) * 0.5
+    distance = center @ planes[:, :3].T + planes[:, 3]
+    radius = extent @ np.abs(planes[:, :3]).T
+
+    outside = (distance + radius < 0).any(axis=1)
+    inside = (distance - radius >= 0).all(axis=1)
+    return np.where(outside, OUTSIDE, np.where(inside, INSIDE, INTERSECTING))
+
+
+class FrustumCuller:
+    """
+    Decide qué objetos ve la cámara a partir de sus cajas en el mundo.
+    Con menos de 'hierarchical_threshold' objetos prueba cada caja; con más arma un PackedBVH
+    y recorre el árbol nivel por nivel, descartando o aceptando subárboles enteros. Cuando las
+    cajas cambian el árbol se reajusta con refit, y se reconstruye si su costo SAH supera
+    'rebuild_threshold' veces el de la construcción.
+    """
+    def __init__(self, hierarchical_threshold=64, rebuild_threshold=1.3):
+        self.hierarchical_threshold = hierarchical_threshold
+        self.rebuild_threshold = rebuild_threshold
+        self.aabb_min = np.zeros((0, 3), dtype=np.float32)
+        self.aabb_max = np.zeros((0, 3), dtype=np.float32)
+        self.bvh = None
+        # Estadísticas de la última llamada a cull.
+        self.visible = 0
+        self.culled = 0
+        self.tested = 0
+
+    def update(self, aabb_min, aabb_max):
+        """Guarda las cajas (N, 3) de este frame y mantiene el BVH al día."""
+        aabb_min = np.asarray(aabb_min, dtype=np.float32).reshape(-1, 3)
+        aabb_max = np.asarray(aabb_max, dtype=np.float32).reshape(-1, 3)
+        count = len(aabb_min)
+
+        if count < self.hierarchical_threshold:
+            self.bvh = None
+        elif self.bvh is None or len(self.aabb_min) != count:
+            self.bvh = PackedBVH(aabb_min, aabb_max)
+        else:
+            changed = np.flatnonzero(((aabb_min != self.aabb_min) | (aabb_max != self.aabb_max)).any(axis=1))
+            if len(changed):
+                self.bvh.refit(aabb_min, aabb_max, changed)
+                if self.bvh.degradation() > self.rebuild_threshold:
+                    self.bvh = PackedBVH(aabb_min, aabb_max)
+        self.aabb_min, self.aabb_max = aabb_min, aabb_max
+
+    def cull(self, planes):
+        """Devuelve una máscara (N,) con True para los objetos cuya caja toca el frustum."""
+        count = len(self.aabb_min)
+        if self.bvh is None:
+            mask = classify_aabbs(planes, self.aabb_min, self.aabb_max) != OUTSIDE
+            self.tested = count
+        else:
+            mask = self.__cull_hierarchical(planes)
+        self.visible = int(mask.sum())
+        self.culled = count - self.visible
+        return mask
+
+    def __cull_hierarchical(self, planes):
+        nodes, ranges = self.bvh.nodes, self.bvh.ranges
+        # Cada nodo aceptado cubre un tramo contiguo de bvh.indices: se marca con un array de diferencias.
+        covered = np.zeros(len(self.aabb_min) + 1, dtype=np.int64)
+        frontier = np.zeros(1, dtype=np.int64)
+        self.tested = 0
+
+        while len(frontier):
+            self.tested += len(frontier)
+            status = classify_aabbs(planes, nodes[frontier, 0:3], nodes[frontier, 4:7])
+            leaf = nodes[frontier, 3] < 0
+            accepted = frontier[(status == INSIDE) | ((status == INTERSECTING) & leaf)]
+            np.add.at(covered, ranges[accepted, 0], 1)
+            np.add.at(covered, ranges[accepted, 0] + ranges[accepted, 1], -1)
+
+            # Solo se baja por los nodos internos que cruzan algún plano.
+            split = frontier[(status == INTERSECTING) & ~leaf]
+            frontier = np.concatenate([nodes[split, 3], -nodes[split, 7] - 2]).astype(np.int64)
+
+        mask = np.zeros(len(self.aabb_min), dtype=bool)
+        mask[self.bvh.indices[np.cumsum(covered[:-1]) > 0]] = True
+        return mask
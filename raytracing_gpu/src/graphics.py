@@ -2,101 +2,257 @@
 
 import numpy as np
 import glm
+from profiler import profiler
+from transform import compose_transforms, transform_aabbs, to_column_major
+from frustum import FrustumCuller
+from resource_cache import content_hash, get_resource_cache
 
 
 class Graphics:
     """
     Gestiona los objetos de bajo nivel de OpenGL (VBO, VAO, Texturas en GPU).
+    Los buffers, el VAO y las texturas se piden al ResourceCache del contexto, así que los
+    objetos con la misma geometría y las mismas texturas comparten los recursos de la GPU.
     """
     def __init__(self, ctx, model, material):
         self.__ctx = ctx
         self.__model = model
         self.__material = material
+        self.__resources = get_resource_cache(ctx)
 
         self.__vbo = self.create_buffers()
-        self.__ibo = self.__ctx.buffer(model.indices.tobytes())
-        self.__vao = self.__ctx.vertex_array(material.shader_program.prog, [*self.__vbo], self.__ibo)
+        self.__ibo = self.__resources.buffer(model.indices)
+        self.__vao = None
+        self.rebuild_vertex_array()
 
         self.__textures = self.load_textures(material.textures_data)
 
+    @property
+    def shader_program(self):
+        return self.__material.shader_program
+
+    @property
+    def uniforms(self):
+        """Nombres de las uniforms del shader del material."""
+        return self.__material.shader_program.uniforms
+
+    def get_textures(self):
+        """Pares (nombre de la uniform, textura en la GPU), en el orden de sus unidades."""
+        return [(name, texture_ctx) for name, (_, texture_ctx) in self.__textures.items()]
+
+    def instance_buffers(self):
+        """Buffers con atributos por instancia que se agregan al VAO. Un objeto suelto no tiene."""
+        return []
+
+    def rebuild_vertex_array(self):
+        """
+        Arma (o vuelve a armar) el VAO con los VBOs del modelo y los buffers por instancia.
+        Sin buffers por instancia el VAO sale del caché; con ellos es propio de este objeto.
+        """
+        if self.__vao is not None:
+            self.__resources.release(self.__vao)
+        program = self.__material.shader_program.prog
+        instance_buffers = self.instance_buffers()
+        if instance_buffers:
+            self.__vao = self.__ctx.vertex_array(program, [*self.__vbo, *instance_buffers], self.__ibo)
+        else:
+            self.__vao = self.__resources.vertex_array(program, self.__vbo, self.__ibo)
+
     def create_buffers(self):
         """
-        Crea los VBOs a partir de los atributos del modelo.
+        Crea los VBOs a partir de los atributos del modelo que usa el shader.
+        Si usa más de uno, van todos intercalados en un solo buffer (ver VertexLayout.interleave).
         """
-        buffers = []
         shader_attributes = self.__material.shader_program.attributes
+        layout = self.__model.vertex_layout
+        used = [a.name for a in layout.get_attributes() if a.name in shader_attributes]
+
+        if len(used) > 1:
+            # La clave sale de los hashes de cada atributo: el array intercalado solo se arma si falta.
+            format, names = layout.interleaved_format(used)
+            key = (format, *(content_hash(a.array) for a in layout.get_attributes() if a.name in names))
+            vbo = self.__resources.buffer(lambda: layout.interleave(names)[0], key=key)
+            return [(vbo, format, *names)]
 
-        for attribute in self.__model.vertex_layout.get_attributes():
+        buffers = []
+        for attribute in layout.get_attributes():
             if attribute.name in shader_attributes:
-                vbo = self.__ctx.buffer(attribute.array.tobytes())
+                vbo = self.__resources.buffer(attribute.array)
                 buffers.append((vbo, attribute.format, attribute.name))
         return buffers
 
     def load_textures(self, textures_data):
         """
-        Carga las texturas en la GPU y las almacena con su configuración.
+        Carga las texturas en la GPU (o reutiliza las idénticas) y las almacena con su configuración.
         """
         textures = {}
         for texture in textures_data:
             if texture.image_data:
-                texture_ctx = self.__ctx.texture(texture.size, texture.channels_amount, texture.get_bytes())
-                if texture.build_mipmaps:
-                    texture_ctx.build_mipmaps()
-                texture_ctx.repeat_x = texture.repeat_x
-                texture_ctx.repeat_y = texture.repeat_y
-                textures[texture.name] = (texture, texture_ctx)
+                textures[texture.name] = (texture, self.__resources.texture(texture))
         return textures
-    
+
+    def __unshare_texture(self, name):
+        """Antes de escribir en una textura se separa de los otros objetos que la comparten."""
+        texture, texture_ctx = self.__textures[name]
+        texture_ctx = self.__resources.unshare_texture(texture_ctx, texture)
+        self.__textures[name] = (texture, texture_ctx)
+        return texture_ctx
+
     def bind_to_image(self, name = "u_texture", unit = 0, read = True, write = True):
-        self.__textures[name][1].bind_to_image(unit, read, write) 
+        texture_ctx = self.__unshare_texture(name) if write else self.__textures[name][1]
+        texture_ctx.bind_to_image(unit, read, write)
 
+    def release(self):
+        """Devuelve al caché los buffers, el VAO y las texturas de este objeto."""
+        self.__resources.release(self.__vao)
+        for vbo, *_ in self.__vbo:
+            self.__resources.release(vbo)
+        self.__resources.release(self.__ibo)
+        for _, texture_ctx in self.__textures.values():
+            self.__resources.release(texture_ctx)
+        self.__vbo, self.__textures, self.__vao, self.__ibo = [], {}, None, None
 
-    def render(self, uniforms):
+
+    def render(self, uniforms, instances=-1):
         """
         Envía las uniforms y las texturas al shader y renderiza el VAO.
+        Con 'instances' dibuja esa cantidad de copias en una sola llamada.
         """
-        for name, value in uniforms.items():
-            if name in self.__material.shader_program.prog:
-                self.__material.set_uniform(name, value)
+        with profiler.stage("raster_draw"):
+            for name, value in uniforms.items():
+                if name in self.__material.shader_program.prog:
+                    self.__material.set_uniform(name, value)
+
+            for i, (name, (tex, tex_ctx)) in enumerate(self.__textures.items()):
+                tex_ctx.use(i)
+                self.__material.shader_program.set_uniform(name, i)
 
-        for i, (name, (tex, tex_ctx)) in enumerate(self.__textures.items()):
-            tex_ctx.use(i)
-            self.__material.shader_program.set_uniform(name, i)
+            self.__vao.render(instances=instances)
 
-        self.__vao.render()
-        
-    def update_texture(self, texture_name, new_data):
+    def draw(self, instances=-1):
+        """Solo renderiza el VAO; las uniforms y texturas ya las dejó listas la RenderQueue."""
+        self.__vao.render(instances=instances)
+
+    def update_texture(self, texture_name, new_data, region=None):
         """
         Actualiza el contenido de una textura en la GPU con nuevos datos de la CPU.
+        Si se indica una región (x0, y0, x1, y1), solo se sube ese rectángulo.
         """
         if texture_name not in self.__textures: 
             raise ValueError(f"No existe la textura {texture_name}")
 
-        texture_obj, texture_ctx = self.__textures[texture_name]
+        texture_ctx = self.__unshare_texture(texture_name)
+        texture_obj = self.__textures[texture_name][0]
         texture_obj.update_data(new_data)
-        texture_ctx.write(texture_obj.get_bytes())
+        if region is None:
+            texture_ctx.write(texture_obj.get_bytes())
+        else:
+            x0, y0, x1, y1 = region
+            pixels = texture_obj.image_data.data[y0:y1, x0:x1]
+            texture_ctx.write(pixels.tobytes(), viewport=(x0, y0, x1 - x0, y1 - y0))
+
+class InstancedGraphics(Graphics):
+    """
+    Dibuja todos los objetos que comparten modelo y material con una sola llamada instanciada.
+    La matriz de modelo de cada instancia va en un buffer por instancia (atributo in_model del
+    shader) y la vista-proyección en la uniform ViewProjection.
+    Con los planos del frustum solo se suben y dibujan las instancias que ve la cámara.
+    """
+    INSTANCE_ATTRIBUTE = "in_model"
+
+    def __init__(self, ctx, model, material, capacity=64):
+        self.__ctx = ctx
+        self.__capacity = capacity
+        self.__instance_buffer = ctx.buffer(reserve=capacity * 64)
+        # Posición, rotación y escala de cada instancia con las que se calcularon las matrices.
+        self.__trs = np.zeros((0, 9))
+        self.__models = np.zeros((0, 16), dtype=np.float32)
+        # Máscara de las instancias cuyas matrices están en el buffer (None = hay que subirlas).
+        self.__uploaded = None
+        # Todas las instancias tienen la geometría del modelo con el que se creó el grupo.
+        self.__local_min, self.__local_max = model.local_bounds
+        self.culler = FrustumCuller()
+        self.instances = []
+        super().__init__(ctx, model, material)
+
+    def instance_buffers(self):
+        return [(self.__instance_buffer, "16f/i", self.INSTANCE_ATTRIBUTE)]
+
+    def add_instance(self, model):
+        self.instances.append(model)
+
+    def remove_instance(self, model):
+        self.instances.remove(model)
+
+    def __reserve(self, count):
+        """Agranda el buffer por instancia de forma geométrica; el VAO se arma de nuevo con el buffer nuevo."""
+        if count <= self.__capacity:
+            return
+        self.__capacity = max(count, 2 * self.__capacity)
+        self.__instance_buffer.release()
+        self.__instance_buffer = self.__ctx.buffer(reserve=self.__capacity * 64)
+        self.rebuild_vertex_array()
+
+    def update_instances(self):
+        """Recalcula en lote las matrices de modelo y las cajas en el mundo, solo si alguna instancia cambió."""
+        trs = np.array([(*obj.position, *obj.rotation, *obj.scale) for obj in self.instances],
+                       dtype=np.float64).reshape(-1, 9)
+        if trs.shape == self.__trs.shape and (trs == self.__trs).all():
+            return
+        self.__trs = trs
+        models, _ = compose_transforms(trs[:, 0:3], trs[:, 3:6], trs[:, 6:9])
+        self.__models = to_column_major(models)
+        local_min = np.broadcast_to(self.__local_min, (len(models), 3))
+        local_max = np.broadcast_to(self.__local_max, (len(models), 3))
+        self.culler.update(*transform_aabbs(models, local_min, local_max))
+        self.__uploaded = None
+
+    def __upload(self, visible):
+        """Sube las matrices de las instancias visibles, solo si cambiaron las matrices o la máscara."""
+        if self.__uploaded is not None and np.array_equal(visible, self.__uploaded):
+            return
+        models = self.__models[visible]
+        self.__reserve(len(models))
+        if len(models):
+            # Se descarta el contenido anterior para no esperar a que la GPU termine de leerlo.
+            self.__instance_buffer.orphan()
+            self.__instance_buffer.write(models)
+        self.__uploaded = visible
+
+    def prepare(self, planes=None):
+        """
+        Deja en el buffer las matrices de las instancias a dibujar (con los planos del frustum,
+        'planes', solo las que ve la cámara) y devuelve cuántas son.
+        """
+        if not self.instances:
+            return 0
+        with profiler.stage("instance_upload"):
+            self.update_instances()
+            if planes is None:
+                visible = np.ones(len(self.instances), dtype=bool)
+            else:
+                visible = self.culler.cull(planes)
+            self.__upload(visible)
+        return int(visible.sum())
+
+    def render(self, uniforms, planes=None):
+        """Dibuja las instancias; con los planos del frustum ('planes') solo las que ve la cámara."""
+        count = self.prepare(planes)
+        if count:
+            super().render(uniforms, count)
+
+    def release(self):
+        super().release()
+        self.__instance_buffer.release()
+
 
 class ComputeGraphics(Graphics):
     def __init__(self, ctx, model, material):
         self.__ctx = ctx
-        self.__model = model
         self.__material = material
         self.textures = material.textures_data
         super().__init__(ctx, model, material)
 
-    def create_primitive(self, primitives):
-        amin, amax = self.__model.aabb
-        primitives.append({"aabb_min": amin, "aabb_max": amax})
-
-    def create_transformation_matrix(self, transformations_matrix, index):
-        m = self.__model.get_model_matrix()
-        transformations_matrix[index, :] = np.array(m.to_list(), dtype='f4').reshape(16)
-
-    def create_inverse_transformation_matrix(self, inverse_transformations_matrix, index):
-        m = self.__model.get_model_matrix()
-        inverse = glm.inverse(m)
-        inverse_transformations_matrix[index, :] = np.array(inverse.to_list(), dtype='f4').reshape(16)
-    
     def create_material_matrix(self, materials_matrix, index):
         reflectivity = self.__material.reflectivity
         r,g,b = self.__material.colorRGB
@@ -0,0 +1,192 @@
+# src/headless.py
+
+import argparse
+import os
+import struct
+import time
+import zlib
+import moderngl
+import numpy as np
+from main import create_camera, create_objects, create_scene, SCENE_TYPE, WIDTH, HEIGHT
+from scene import RayScene
+from profiler import profiler
+
+
+class HeadlessWindow:
+    """
+    Reemplaza a Window en equipos sin pantalla: crea un contexto de ModernGL
+    independiente (o EGL) y dibuja la escena sobre un framebuffer fuera de pantalla.
+    """
+    def __init__(self, width, height, backend=None, require=430):
+        """
+        Crea el contexto sin ventana y el framebuffer donde se dibujan los frames.
+        Se pide OpenGL 4.3 porque el raytracer por GPU usa compute shaders.
+        """
+        options = {"backend": backend} if backend else {}
+        self.ctx = moderngl.create_standalone_context(require=require, **options)
+        self.width = width
+        self.height = height
+
+        # Framebuffer con color y profundidad que hace de "pantalla" virtual.
+        self.fbo = self.ctx.simple_framebuffer((width, height))
+        self.fbo.use()
+        self.ctx.enable(moderngl.DEPTH_TEST)
+        self.scene = None
+
+    def set_scene(self, scene):
+        """Asigna la escena y llama a su método de inicio, igual que Window."""
+        self.scene = scene
+        self.scene.start()
+        # Lo que se midió al preparar la escena no es parte del primer frame.
+        profiler.end_setup()
+
+    def render_frame(self):
+        """Dibuja un frame igual que Window.on_draw y espera a que la GPU termine."""
+        self.fbo.use()
+        self.ctx.clear(0.08, 0.16, 0.18)
+        self.scene.render()
+        self.ctx.finish()
+        profiler.end_frame()
+
+    def read_pixels(self):
+        """Devuelve el frame como un array (alto, ancho, 3) con la primera fila arriba."""
+        data = np.frombuffer(self.fbo.read(components=3), dtype=np.uint8)
+        return data.reshape(self.height, self.width, 3)[::-1]
+
+
+class HeadlessCPU:
+    """
+    Ejecuta el raytracer por CPU sin ningún contexto de OpenGL: usa la RayScene
+    solo por sus objetos, su animación y su raytracer.
+    """
+    def __init__(self, width, height, workers=0):
+        self.scene = RayScene(None, create_camera(width, height), width, height, workers)
+        self.scene.objects.extend(create_objects())
+
+    def render_frame(self):
+        self.scene.raytracer.render_frame(self.scene.objects)
+        self.scene.update()
+
+    def read_pixels(self):
+        # La fila 0 del framebuffer es la de abajo de la imagen.
+        return self.scene.raytracer.get_texture().data[::-1]
+
+    def close(self):
+        self.scene.raytracer.close()
+
+
+def write_image(path, pixels):
+    """
+    Guarda un array (alto, ancho, 3) como PNG, o como bytes RGB crudos si la extensión es .raw.
+    El archivo se arma entero en memoria y se escribe de una vez.
+    """
+    pixels = np.ascontiguousarray(pixels, dtype=np.uint8)
+    if path.endswith(".raw"):
+        data = pixels.tobytes()
+    else:
+        height, width = pixels.shape[:2]
+        # Cada fila del PNG empieza con un byte de filtro (0 = sin filtro).
+        rows = np.hstack([np.zeros((height, 1), dtype=np.uint8), pixels.reshape(height, -1)])
+        chunks = [(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+                  (b"IDAT", zlib.compress(rows.tobytes(), 6)),
+                  (b"IEND", b"")]
+        data = b"\x89PNG\r\n\x1a\n" + b"".join(
+            struct.pack(">I", len(body)) + tag + body + struct.pack(">I", zlib.crc32(tag + body))
+            for tag, body in chunks)
+    with open(path, "wb") as file:
+        file.write(data)
+
+
+def prepare_output(parser, output):
+    """Crea la carpeta de salida; si no se puede usar, termina con un error antes de renderizar."""
+    if not output:
+        return
+    try:
+        os.makedirs(output, exist_ok=True)
+    except OSError as error:
+        parser.error(f"No se puede crear la carpeta de salida '{output}': {error.strerror}")
+    if not os.access(output, os.W_OK):
+        parser.error(f"No se puede escribir en la carpeta de salida '{output}'")
+
+
+def save_frame(output, frame, image_format, pixels):
+    """Guarda el frame en la carpeta de salida; un error de escritura termina el programa con un mensaje."""
+    path = os.path.join(output, f"frame_{frame:04d}.{image_format}")
+    try:
+        write_image(path, pixels)
+    except OSError as error:
+        raise SystemExit(f"No se pudo guardar '{path}': {error.strerror}")
+
+
+def report(times, pixels_per_frame):
+    """Imprime el tiempo total y el rendimiento medio de la tanda."""
+    total = sum(times)
+    average = total / len(times)
+    print(f"Frames: {len(times)}  Total: {total:.3f} s  Promedio: {average * 1000:.2f} ms  "
+          f"FPS: {1.0 / average:.2f}  Píxeles/s: {pixels_per_frame / average:,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Renderiza la escena sin ventana y guarda los frames.")
+    parser.add_argument("--scene", choices=["normal", "cpu", "gpu"], default=SCENE_TYPE)
+    parser.add_argument("--width", type=int, default=WIDTH)
+    parser.add_argument("--height", type=int, default=HEIGHT)
+    parser.add_argument("--frames", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=0, help="Procesos para el render por CPU.")
+    parser.add_argument("--output", default="frames", help="Carpeta de salida; vacío para no guardar.")
+    parser.add_argument("--format", choices=["png", "raw"], default="png")
+    parser.add_argument("--backend", default=None, help="Backend de ModernGL, ej: egl.")
+    parser.add_argument("--accumulate", action="store_true", help="Acumula muestras en el raytracer por GPU.")
+    parser.add_argument("--target-ms", type=float, default=None,
+                        help="Tiempo de dispatch objetivo (ms) para la resolución dinámica del raytracer por GPU.")
+    parser.add_argument("--quality", choices=["low", "medium", "high"], default="high",
+                        help="Preset de calidad del raytracer por GPU.")
+    parser.add_argument("--autotune", action="store_true",
+                        help="Mide las formas de grupo del compute shader al empezar y guarda la elegida.")
+    parser.add_argument("--instanced", action="store_true",
+                        help="Dibuja con instancias los objetos que comparten modelo y material.")
+    parser.add_argument("--no-culling", action="store_true",
+                        help="Dibuja todos los objetos aunque queden fuera del frustum de la cámara.")
+    parser.add_argument("--profile", default=None, help="CSV donde volcar los tiempos por etapa al salir.")
+    args = parser.parse_args()
+    if args.frames < 1:
+        parser.error("--frames tiene que ser al menos 1")
+    prepare_output(parser, args.output)
+
+    if args.profile:
+        profiler.enable(args.profile)
+
+    if args.scene == "cpu":
+        runner = HeadlessCPU(args.width, args.height, args.workers)
+    else:
+        runner = HeadlessWindow(args.width, args.height, args.backend)
+        runner.set_scene(create_scene(runner.ctx, args.width, args.height, args.scene,
+                                       accumulate=args.accumulate, target_frame_ms=args.target_ms,
+                                       quality=args.quality, autotune=args.autotune,
+                                       instanced=args.instanced))
+        runner.scene.culling = not args.no_culling
+
+    times = []
+    try:
+        for frame in range(args.frames):
+            start = time.perf_counter()
+            runner.render_frame()
+            times.append(time.perf_counter() - start)
+            print(f"Frame {frame}: {times[-1] * 1000:.2f} ms")
+
+            if args.output:
+                save_frame(args.output, frame, args.format, runner.read_pixels())
+    finally:
+        if args.scene == "cpu":
+            runner.close()
+    report(times, args.width * args.height)
+    if args.scene == "normal":
+        print("  " + "  ".join(f"{name}: {value}" for name, value in runner.scene.stats.items()))
+    if profiler.setup:
+        print("  preparación: " + "  ".join(f"{name} {ms:.3f} ms" for name, ms in profiler.setup.items()))
+    for name, values in profiler.summary().items():
+        print(f"  {name:<18} p50 {values[50]:.3f} ms  p90 {values[90]:.3f} ms  p99 {values[99]:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
+import numpy as np
 import glm
 
 
 class Hit:
-    def __init__(self, get_model_matrix, hittable = True):
+    def __init__(self, get_model_matrix, hittable = True, get_inverse_model_matrix = None):
         self.__model_matrix = get_model_matrix
+        self.__inverse_model_matrix = get_inverse_model_matrix
         self.hittable = hittable
 
 
@@ -12,6 +14,14 @@ class Hit:
         return self.__model_matrix()
 
 
+    @property
+    def inverse_model_matrix(self):
+        # Si el objeto guarda su inversa en caché, se usa en lugar de recalcularla.
+        if self.__inverse_model_matrix is not None:
+            return self.__inverse_model_matrix()
+        return glm.inverse(self.model_matrix)
+
+
     @property
     def position(self):
         m = self.model_matrix
@@ -31,8 +41,8 @@ class Hit:
 
 
 class HitBoxOBB(Hit):
-    def __init__(self, get_model_matrix, hittable = True):
-        super().__init__(get_model_matrix, hittable)
+    def __init__(self, get_model_matrix, hittable = True, get_inverse_model_matrix = None):
+        super().__init__(get_model_matrix, hittable, get_inverse_model_matrix)
 
 
     def check_hit(self, origin, direction):
@@ -44,7 +54,7 @@ class HitBoxOBB(Hit):
         direction = glm.normalize(glm.vec3(direction))
 
 
-        inv_model = glm.inverse(self.model_matrix)
+        inv_model = self.inverse_model_matrix
         local_origin = inv_model * glm.vec4(origin, 1.0)
         local_dir = inv_model * glm.vec4(direction, 0.0)
 
@@ -70,3 +80,79 @@ class HitBoxOBB(Hit):
 
 
         return t_near <= t_far and t_far >= 0
+
+
+    def check_hit_batch(self, origins, directions):
+        """
+        Versión vectorizada de check_hit para N rayos contra esta caja.
+        Devuelve la máscara de colisión y la distancia t de cada rayo (inf si no hay colisión).
+        """
+        hits, distances, _ = check_hit_batch(origins, directions, *pack_hitboxes([self]))
+        return hits, distances
+
+
+def pack_hitboxes(hitboxes):
+    """
+    Empaqueta las matrices inversas de varias hitboxes en un array (M, 4, 4) float32,
+    junto con una máscara (M,) que indica cuáles son golpeables.
+    """
+    inverse_models = np.array([hitbox.inverse_model_matrix for hitbox in hitboxes], dtype=np.float32)
+    hittable = np.array([hitbox.hittable for hitbox in hitboxes], dtype=bool)
+    return inverse_models.reshape(-1, 4, 4), hittable
+
+
+def check_hit_batch(origins, directions, inverse_models, hittable=None, max_elements=1 << 21):
+    """
+    Intersecta N rayos contra M cajas OBB de una sola vez con NumPy.
+    Recibe orígenes y direcciones (N, 3) y las matrices inversas (M, 4, 4) de pack_hitboxes.
+    Devuelve la máscara de colisión (N,), la distancia t al impacto más cercano (N,)
+    y el índice de la caja golpeada (N,), que vale -1 cuando el rayo no choca con nada.
+    A diferencia de llamar check_hit caja por caja, solo informa la caja más cercana de cada
+    rayo: las que quedan detrás no aparecen en el resultado.
+    """
+    origins = np.asarray(origins, dtype=np.float32).reshape(-1, 3)
+    directions = np.asarray(directions, dtype=np.float32).reshape(-1, 3)
+    directions = directions / np.sqrt(np.sum(directions * directions, axis=1))[:, None]
+    if hittable is None:
+        hittable = np.ones(len(inverse_models), dtype=bool)
+
+    n = len(origins)
+    nearest = np.full(n, np.inf, dtype=np.float32)
+    nearest_index = np.full(n, -1, dtype=np.int32)
+
+    # Se procesan las cajas por bloques para acotar la memoria de los arrays (N, K, 3).
+    candidates = np.flatnonzero(hittable)
+    chunk = max(1, max_elements // max(n, 1))
+
+    for start in range(0, len(candidates), chunk):
+        boxes = candidates[start:start + chunk]
+        rotation = inverse_models[boxes, :3, :3]
+        translation = inverse_models[boxes, :3, 3]
+
+        # Rayo en el espacio local de cada caja. La dirección no se normaliza para que
+        # t quede expresado en unidades del mundo.
+        local_origin = (origins[:, None, 0, None] * rotation[None, :, :, 0]
+                        + origins[:, None, 1, None] * rotation[None, :, :, 1]
+                        + origins[:, None, 2, None] * rotation[None, :, :, 2]
+                        + translation[None])
+        local_dir = (directions[:, None, 0, None] * rotation[None, :, :, 0]
+                     + directions[:, None, 1, None] * rotation[None, :, :, 1]
+                     + directions[:, None, 2, None] * rotation[None, :, :, 2])
+
+        # Test de slabs contra el cubo local de -1 a 1.
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tmin = (-1.0 - local_origin) / local_dir
+            tmax = (1.0 - local_origin) / local_dir
+        t_near = np.minimum(tmin, tmax).max(axis=2)
+        t_far = np.maximum(tmin, tmax).min(axis=2)
+
+        hit = (t_near <= t_far) & (t_far >= 0)
+        distance = np.where(hit, np.where(t_near >= 0, t_near, t_far), np.inf)
+
+        best = np.argmin(distance, axis=1)
+        best_distance = distance[np.arange(n), best]
+        closer = best_distance < nearest
+        nearest[closer] = best_distance[closer]
+        nearest_index[closer] = boxes[best[closer]]
+
+    return nearest_index >= 0, nearest, nearest_index
@@ -1,4 +1,3 @@
-from window import Window
 from texture import Texture
 from material import Material, StandardMaterial
 from shader_program import ShaderProgram
@@ -12,6 +11,7 @@ WIDTH, HEIGHT = 800, 600
 
 
 SCENE_TYPE = "normal"  # Opciones: "normal", "cpu", "gpu"
+PROFILE_CSV = None  # Ej: "profile.csv" para medir cada etapa del frame y volcarla al salir.
 
 
 scene_configs = {
@@ -33,58 +33,74 @@ scene_configs = {
 }
 
 
-config = scene_configs[SCENE_TYPE]
-
-
-window = Window(WIDTH, HEIGHT, f"Basic Graphic Engine - {SCENE_TYPE.upper()}")
-
-
-shader = ShaderProgram(window.ctx, 'shaders/basic.vert', 'shaders/basic.frag')
-shader_sprite = ShaderProgram(window.ctx, 'shaders/sprite.vert', 'shaders/sprite.frag')
-
-
-albedo_red = Texture("u_texture", WIDTH, HEIGHT, 3, None, (200, 10, 190))
-albedo_blue = Texture("u_texture", WIDTH, HEIGHT, 3, None, (0, 0, 255))
-albedo_pearl = Texture("u_texture", WIDTH, HEIGHT, 3, None, (120, 90, 90))
-sprite_texture = Texture(width=WIDTH, height=HEIGHT, channels_amount= config["sprite_channels_amount"], color= config["sprite_default_color"])
-
-
-material_plastic = StandardMaterial(shader, albedo_red, reflectivity=0.0)
-material_glass = StandardMaterial(shader, albedo_blue, reflectivity=0.2)
-material_ceramic = StandardMaterial(shader, albedo_pearl, reflectivity=0.1)
-material_sprite = Material(shader_sprite, textures_data=[sprite_texture])
-
-
-cube1 = Cube((2, 0, 5), (0, 0, 0), (1, 1, 1), name="Cube1")
-cube2 = Cube((-2, 0, 5), (0, 0, 0), (1, 1, 1), name="Cube2")
-quad = Quad((0, -3, 0), (-90, 0, 0), (10, 15, 1), name="Floor", animated=False)
-sprite = Quad((0, 0, 0), (0, 0, 0), (10, 15, 1), name="Sprite", animated=False, hittable=False)
-
-
-camera = Camera((0, 0, 15), (0, 0, 0), (0, 1, 0), 45, WIDTH / HEIGHT, 0.01, 100.0)
-camera.set_sky_colors(top=(16, 150, 222), bottom=(181, 224, 247))
-
-
-if SCENE_TYPE == "normal":
-    scene = Scene(window.ctx, camera)
-    scene.add_object(cube1, material_plastic)
-    scene.add_object(cube2, material_glass)
-
-
-elif SCENE_TYPE == "cpu":
-    scene = RayScene(window.ctx, camera, WIDTH, HEIGHT)
-    scene.add_object(sprite, material_sprite)
-    scene.add_object(cube1, material_plastic)
-    scene.add_object(cube2, material_glass)
-    scene.add_object(quad, material_ceramic)
-
-
-elif SCENE_TYPE == "gpu":
-    scene = RaySceneGPU(window.ctx, camera, WIDTH, HEIGHT, sprite, material_sprite)
-    scene.add_object(cube1, material_plastic)
-    scene.add_object(cube2, material_glass)
-    scene.add_object(quad, material_ceramic)
-
-
-window.set_scene(scene)
-window.run()
+def create_camera(width, height):
+    camera = Camera((0, 0, 15), (0, 0, 0), (0, 1, 0), 45, width / height, 0.01, 100.0)
+    camera.set_sky_colors(top=(16, 150, 222), bottom=(181, 224, 247))
+    return camera
+
+
+def create_objects():
+    """Crea los objetos de la escena. No necesitan contexto de OpenGL."""
+    cube1 = Cube((2, 0, 5), (0, 0, 0), (1, 1, 1), name="Cube1")
+    cube2 = Cube((-2, 0, 5), (0, 0, 0), (1, 1, 1), name="Cube2")
+    quad = Quad((0, -3, 0), (-90, 0, 0), (10, 15, 1), name="Floor", animated=False)
+    sprite = Quad((0, 0, 0), (0, 0, 0), (10, 15, 1), name="Sprite", animated=False, hittable=False)
+    return cube1, cube2, quad, sprite
+
+
+def create_scene(ctx, width, height, scene_type=SCENE_TYPE, workers=0, accumulate=False, target_frame_ms=None,
+                 quality="high", autotune=False, instanced=False):
+    """
+    Arma la escena del tipo pedido sobre un contexto de ModernGL ya creado.
+    Con 'instanced' la escena por rasterizado dibuja juntos los objetos con el mismo modelo y material.
+    """
+    config = scene_configs[scene_type]
+
+    vertex_shader = 'shaders/basic_instanced.vert' if instanced else 'shaders/basic.vert'
+    shader = ShaderProgram(ctx, vertex_shader, 'shaders/basic.frag')
+    shader_sprite = ShaderProgram(ctx, 'shaders/sprite.vert', 'shaders/sprite.frag')
+
+    albedo_red = Texture("u_texture", width, height, 3, None, (200, 10, 190))
+    albedo_blue = Texture("u_texture", width, height, 3, None, (0, 0, 255))
+    albedo_pearl = Texture("u_texture", width, height, 3, None, (120, 90, 90))
+    sprite_texture = Texture(width=width, height=height, channels_amount= config["sprite_channels_amount"], color= config["sprite_default_color"])
+
+    material_plastic = StandardMaterial(shader, albedo_red, reflectivity=0.0)
+    material_glass = StandardMaterial(shader, albedo_blue, reflectivity=0.2)
+    material_ceramic = StandardMaterial(shader, albedo_pearl, reflectivity=0.1)
+    material_sprite = Material(shader_sprite, textures_data=[sprite_texture])
+
+    cube1, cube2, quad, sprite = create_objects()
+    camera = create_camera(width, height)
+
+    if scene_type == "normal":
+        scene = Scene(ctx, camera)
+        scene.add_object(cube1, material_plastic)
+        scene.add_object(cube2, material_glass)
+
+    elif scene_type == "cpu":
+        scene = RayScene(ctx, camera, width, height, workers, progressive=True)
+        scene.add_object(sprite, material_sprite)
+        scene.add_object(cube1, material_plastic)
+        scene.add_object(cube2, material_glass)
+        scene.add_object(quad, material_ceramic)
+
+    elif scene_type == "gpu":
+        scene = RaySceneGPU(ctx, camera, width, height, sprite, material_sprite, accumulate=accumulate,
+                            target_frame_ms=target_frame_ms, quality=quality, autotune=autotune)
+        scene.add_object(cube1, material_plastic)
+        scene.add_object(cube2, material_glass)
+        scene.add_object(quad, material_ceramic)
+
+    return scene
+
+
+if __name__ == "__main__":
+    from window import Window
+    from profiler import profiler
+
+    if PROFILE_CSV:
+        profiler.enable(PROFILE_CSV)
+    window = Window(WIDTH, HEIGHT, f"Basic Graphic Engine - {SCENE_TYPE.upper()}")
+    window.set_scene(create_scene(window.ctx, WIDTH, HEIGHT))
+    window.run()
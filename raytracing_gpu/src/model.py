@@ -1,5 +1,7 @@
 # src/model.py
 
+import numpy as np
+
 class Vertex:
     """Representa un único atributo de vértice (ej: posiciones)."""
     def __init__(self, name, format, array):
@@ -30,6 +32,45 @@ class VertexLayout:
     def get_attributes(self):
         return self.__attributes
 
+    def interleave(self, names=None, align=16):
+        """
+        Junta los atributos pedidos (todos si 'names' es None) en un único array intercalado:
+        cada vértice ocupa una fila con sus atributos seguidos, rellenada hasta un múltiplo de
+        'align' bytes. Devuelve el array, el formato combinado para ModernGL (ej: "3f 3f 8x")
+        y los nombres de los atributos en el mismo orden.
+        """
+        format, names = self.interleaved_format(names, align)
+        attributes = [a for a in self.__attributes if a.name in names]
+
+        columns = [np.asarray(a.array, dtype='f4').reshape(-1, int(a.format[:-1] or 1)) for a in attributes]
+        vertex_count = len(columns[0])
+        if any(len(column) != vertex_count for column in columns):
+            raise ValueError("Los atributos no tienen la misma cantidad de vértices.")
+
+        padding = int(format.split()[-1][:-1]) if format.endswith("x") else 0
+        if padding:
+            # El relleno se agrega como columnas float en cero para que el array tenga el stride final.
+            columns.append(np.zeros((vertex_count, padding // 4), dtype='f4'))
+        return np.hstack(columns), format, names
+
+    def interleaved_format(self, names=None, align=16):
+        """Formato combinado y nombres de interleave, sin armar el array."""
+        attributes = [a for a in self.__attributes if names is None or a.name in names]
+        if not attributes:
+            raise ValueError("No hay atributos para intercalar.")
+
+        stride = 0
+        for attribute in attributes:
+            if attribute.format[-1] != "f":
+                raise ValueError(f"Solo se pueden intercalar atributos float, '{attribute.name}' es '{attribute.format}'.")
+            stride += int(attribute.format[:-1] or 1) * 4
+
+        formats = [attribute.format for attribute in attributes]
+        padding = -stride % align
+        if padding:
+            formats.append(f"{padding}x")
+        return " ".join(formats), [attribute.name for attribute in attributes]
+
 class Model:
     """Clase base para todos los modelos 3D del proyecto."""
     def __init__(self, vertices=None, indices=None, colors=None, normals=None, texcoords=None):
@@ -43,4 +84,13 @@ class Model:
         if normals is not None:
             self.vertex_layout.add_attribute("in_normal", "3f", normals)
         if texcoords is not None:
-            self.vertex_layout.add_attribute("in_uv", "2f", texcoords)
\ No newline at end of file
+            self.vertex_layout.add_attribute("in_uv", "2f", texcoords)
+
+    @property
+    def local_bounds(self):
+        """Caja (min, max) de los vértices en espacio local, como arrays de NumPy (3,)."""
+        for attribute in self.vertex_layout.get_attributes():
+            if attribute.name == "in_pos":
+                positions = attribute.array.reshape(-1, 3)
+                return positions.min(axis=0), positions.max(axis=0)
+        return np.zeros(3, dtype='f4'), np.zeros(3, dtype='f4')
@@ -0,0 +1,167 @@
+# src/profiler.py
+
+import atexit
+import time
+import numpy as np
+
+
+class _NullStage:
+    """Etapa vacía que se devuelve cuando el profiler está apagado, para no medir nada."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """Mide el tiempo transcurrido dentro de un bloque 'with' y lo suma a la etapa del frame actual."""
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class FrameProfiler:
+    """
+    Registra cuánto tarda cada etapa del frame (animación, matrices, BVH, subidas a SSBO,
+    dispatch y dibujo) en un buffer circular con los últimos 'capacity' frames.
+    Apagado no mide nada: stage() devuelve un contexto vacío compartido.
+    Lo medido antes de end_setup (carga de la escena, primera construcción del BVH...) se
+    guarda aparte en 'setup' y no cuenta como frame.
+    """
+    def __init__(self, capacity=1000):
+        self.enabled = False
+        self.capacity = capacity
+        # Tiempos (ms) por etapa de la preparación, antes del primer frame.
+        self.setup = {}
+        self.csv_path = None
+        self.__history = {}
+        self.__current = {}
+        self.__frames = 0
+        # Frames guardados en el buffer y posición donde se escribe el próximo.
+        self.__stored = 0
+        self.__slot = 0
+        self.__dump_registered = False
+
+    def enable(self, csv_path=None, capacity=None):
+        """
+        Activa las mediciones y, si se indica un archivo, vuelca el CSV al terminar el programa.
+        Llamarlo otra vez solo cambia el archivo: el volcado al salir se registra una vez.
+        Si cambia la capacidad se conservan los frames más recientes que entren en el buffer nuevo.
+        """
+        if capacity is not None and capacity != self.capacity:
+            if capacity < 1:
+                raise ValueError("La capacidad del profiler tiene que ser al menos 1")
+            self.__resize(capacity)
+        self.enabled = True
+        if csv_path is not None:
+            self.csv_path = csv_path
+            if not self.__dump_registered:
+                atexit.register(self.__dump_at_exit)
+                self.__dump_registered = True
+
+    def __resize(self, capacity):
+        kept = min(self.__stored, capacity)
+        for name, history in self.__history.items():
+            resized = np.full(capacity, np.nan)
+            resized[:kept] = self.__ordered(history)[self.__stored - kept:]
+            self.__history[name] = resized
+        self.capacity = capacity
+        self.__stored = kept
+        self.__slot = kept % capacity
+
+    def __ordered(self, history):
+        """Los valores guardados de una etapa, del frame más viejo al más nuevo."""
+        start = (self.__slot - self.__stored) % self.capacity
+        return np.roll(history, -start)[:self.__stored]
+
+    def __dump_at_exit(self):
+        if self.csv_path is not None:
+            self.dump_csv(self.csv_path)
+
+    def disable(self):
+        self.enabled = False
+
+    def stage(self, name):
+        """Devuelve un contexto que mide el bloque como parte de la etapa 'name'."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def add(self, name, seconds):
+        """Suma una duración a la etapa dentro del frame actual (una etapa puede medirse varias veces por frame)."""
+        self.__current[name] = self.__current.get(name, 0.0) + seconds
+
+    def end_setup(self):
+        """Cierra la preparación: lo medido hasta ahora pasa a 'setup' y el próximo frame empieza vacío."""
+        if not self.enabled:
+            return
+        self.setup = {name: seconds * 1000.0 for name, seconds in self.__current.items()}
+        self.__current = {}
+
+    def end_frame(self):
+        """Cierra el frame actual y guarda sus tiempos (en ms) en el buffer circular."""
+        if not self.enabled:
+            return
+        slot = self.__slot
+        for name, seconds in self.__current.items():
+            if name not in self.__history:
+                self.__history[name] = np.full(self.capacity, np.nan)
+            self.__history[name][slot] = seconds * 1000.0
+        # Las etapas que no corrieron en este frame quedan vacías.
+        for name, history in self.__history.items():
+            if name not in self.__current:
+                history[slot] = np.nan
+        self.__current = {}
+        self.__frames += 1
+        self.__stored = min(self.__stored + 1, self.capacity)
+        self.__slot = (slot + 1) % self.capacity
+
+    def stages(self):
+        return list(self.__history)
+
+    def samples(self, name):
+        """Devuelve los tiempos (ms) registrados de una etapa, del frame más viejo al más nuevo."""
+        history = self.__history.get(name)
+        if history is None:
+            return np.empty(0)
+        ordered = self.__ordered(history)
+        return ordered[~np.isnan(ordered)]
+
+    def percentiles(self, name, q=(50, 90, 99)):
+        """Devuelve un diccionario {percentil: ms} para la etapa pedida."""
+        samples = self.samples(name)
+        if len(samples) == 0:
+            return {p: float("nan") for p in q}
+        return dict(zip(q, np.percentile(samples, q).tolist()))
+
+    def summary(self, q=(50, 90, 99)):
+        return {name: self.percentiles(name, q) for name in self.__history}
+
+    def dump_csv(self, path):
+        """Escribe un CSV con una fila por frame registrado y una columna (ms) por etapa."""
+        names = self.stages()
+        columns = [self.__ordered(self.__history[n]) for n in names]
+        first = self.__frames - self.__stored
+
+        with open(path, "w") as file:
+            file.write(",".join(["frame", *names]) + "\n")
+            for i in range(self.__stored):
+                values = ["" if np.isnan(column[i]) else f"{column[i]:.4f}" for column in columns]
+                file.write(",".join([str(first + i), *values]) + "\n")
+
+
+# Instancia compartida por la escena, el raytracer y los gráficos.
+profiler = FrameProfiler()
@@ -1,83 +1,360 @@
 # src/raytracer.py
 
-from texture import Texture
-from shader_program import ComputeShaderProgram
-from bvh import BVH
+from texture import Texture, ImageData
+from hit import pack_hitboxes, check_hit_batch
+import numpy as np
+import multiprocessing
+from shader_program import get_compute_shader
+from bvh import BVH, PackedBVH
+from profiler import profiler
+from storage_buffer import StorageBufferManager
+from dynamic_resolution import DispatchTimer, ResolutionController
+from workgroup_tuner import WORKGROUP_CACHE, WORKGROUP_SHAPES, tuning_key, load_tuning, save_tuning, tune_workgroup
+
+
+# Buffer compartido del framebuffer visto desde cada proceso del pool.
+_worker_image = None
+
+
+def _init_worker(buffer, shape):
+    global _worker_image
+    _worker_image = np.frombuffer(buffer, dtype=np.uint8).reshape(shape)
+
+
+def _shade(camera, origins, directions, inverse_models, hittable):
+    """Traza un lote de rayos y devuelve un color (N, 3) por rayo."""
+    hits, _, _ = check_hit_batch(origins, directions, inverse_models, hittable)
+    colors = camera.get_sky_gradient_batch(directions[:, 1])
+    colors[hits] = (255, 0, 0)  # Rojo para indicar colisión
+    return colors
+
+
+def _render_tile(camera, width, height, tile, inverse_models, hittable, image=None):
+    """Traza los píxeles de un tile y los escribe en la imagen (por defecto, la compartida del proceso)."""
+    image = _worker_image if image is None else image
+    x0, y0, x1, y1 = tile
+    origins, directions = camera.raycast_batch(width, height, tile)
+    colors = _shade(camera, origins, directions, inverse_models, hittable)
+    image[y0:y1, x0:x1] = colors.reshape(y1 - y0, x1 - x0, 3)
 
 
 class RayTracer:
     """Genera una imagen por CPU lanzando rayos a la escena."""
-    def __init__(self, camera, width, height):
+    def __init__(self, camera, width, height, workers=0, tile_size=64):
         self.camera = camera
         self.width = width
         self.height = height
-        self.framebuffer = Texture(width=width, height=height, channels_amount=3)
+        self.workers = workers
+        self.tile_size = tile_size
+        self.__pool = None
+
+        # Con varios procesos, el framebuffer vive en memoria compartida para que
+        # cada worker escriba sus tiles directamente sobre ImageData.data.
+        self.__buffer = multiprocessing.RawArray('B', width * height * 3) if workers > 1 else None
+        image_data = ImageData(height, width, 3, buffer=self.__buffer)
+        self.framebuffer = Texture(width=width, height=height, channels_amount=3, image_data=image_data)
 
         self.camera.set_sky_colors(top=(16, 150, 222), bottom=(181, 224, 247))
 
     def trace_ray(self, ray, objects):
         """Lanza un único rayo y determina su color."""
-        for obj in objects:
-            if obj.check_hit(ray.origin, ray.direction):
-                return (255, 0, 0)  # Rojo para indicar colisión
-        height = ray.direction.y
-        return self.camera.get_sky_gradient(height)
+        colors = self.trace_rays(np.array([ray.origin]), np.array([ray.direction]), objects)
+        return colors[0]
+
+    def trace_rays(self, origins, directions, objects):
+        """Lanza un lote de rayos contra todos los objetos a la vez y devuelve un color (N, 3) por rayo."""
+        inverse_models, hittable = pack_hitboxes([obj.hitbox for obj in objects])
+        return _shade(self.camera, origins, directions, inverse_models, hittable)
+
+    def tiles(self):
+        """Divide el framebuffer en tiles (x0, y0, x1, y1) de tile_size píxeles de lado."""
+        for y in range(0, self.height, self.tile_size):
+            for x in range(0, self.width, self.tile_size):
+                yield (x, y, min(x + self.tile_size, self.width), min(y + self.tile_size, self.height))
+
+    def render_tile(self, tile, inverse_models, hittable):
+        """Traza un único tile sobre el framebuffer a partir de las hitboxes empaquetadas."""
+        _render_tile(self.camera, self.width, self.height, tile, inverse_models, hittable,
+                     self.framebuffer.image_data.data)
+
+    def render_preview(self, objects, step=8):
+        """
+        Genera una vista previa rápida trazando un solo rayo por cada bloque de step x step
+        píxeles y replicando su color en todo el bloque.
+        """
+        inverse_models, hittable = pack_hitboxes([obj.hitbox for obj in objects])
+        width, height = -(-self.width // step), -(-self.height // step)
+        origins, directions = self.camera.raycast_batch(width, height)
+        colors = _shade(self.camera, origins, directions, inverse_models, hittable).reshape(height, width, 3)
+        colors = colors.repeat(step, axis=0).repeat(step, axis=1)
+        self.framebuffer.set_region(0, 0, colors[:self.height, :self.width])
 
     def render_frame(self, objects):
-        """Recorre cada píxel de la pantalla para generar la imagen completa."""
-        for y in range(self.height):
-            for x in range(self.width):
-                u = x / (self.width - 1)
-                v = y / (self.height - 1)
-                ray = self.camera.raycast(u, v)
-                color = self.trace_ray(ray, objects)
-                self.framebuffer.set_pixel(x, y, color)
+        """Recorre cada tile de la pantalla para generar la imagen completa."""
+        inverse_models, hittable = pack_hitboxes([obj.hitbox for obj in objects])
+
+        if self.__buffer is None:
+            for tile in self.tiles():
+                self.render_tile(tile, inverse_models, hittable)
+            return
+
+        # Modo paralelo: los mismos tiles se reparten entre los procesos del pool.
+        if self.__pool is None:
+            self.__pool = multiprocessing.Pool(self.workers, initializer=_init_worker,
+                                               initargs=(self.__buffer, (self.height, self.width, 3)))
+        tasks = [(self.camera, self.width, self.height, tile, inverse_models, hittable) for tile in self.tiles()]
+        self.__pool.starmap(_render_tile, tasks)
+
+    def close(self):
+        """Libera el pool de procesos del modo paralelo."""
+        if self.__pool is not None:
+            self.__pool.close()
+            self.__pool.join()
+            self.__pool = None
     
     def get_texture(self):
         """Devuelve los datos de la imagen renderizada."""
         return self.framebuffer.image_data
     
+def _halton(index, base):
+    """Elemento 'index' de la secuencia de Halton en la base dada, en [0, 1)."""
+    result, fraction = 0.0, 1.0
+    while index > 0:
+        fraction /= base
+        result += fraction * (index % base)
+        index //= base
+    return result
+
+
+def pixel_offset(sample):
+    """
+    Desplazamiento dentro del píxel para la muestra número 'sample' (empezando en 1).
+    La primera es el centro, como sin acumulación; las siguientes siguen Halton(2, 3).
+    """
+    if sample <= 1:
+        return (0.5, 0.5)
+    return (_halton(sample - 1, 2), _halton(sample - 1, 3))
+
+
 class RayTracerGPU:
-    def __init__(self, ctx, camera, width, height, output_graphics):
+    # "array" construye el BVH con PackedBVH sobre arrays; el resto son estrategias de BVH.
+    BVH_STRATEGIES = ("array",) + BVH.STRATEGIES
+
+    # Defines del compute shader para cada preset de calidad.
+    QUALITY_PRESETS = {
+        "low": {"MAX_RAY_BOUNCES": 1, "ENABLE_SHADOWS": False},
+        "medium": {"MAX_RAY_BOUNCES": 2, "ENABLE_SHADOWS": True},
+        "high": {"MAX_RAY_BOUNCES": 3, "ENABLE_SHADOWS": True},
+    }
+    SHADER_PATH = "shaders/raytracing.comp"
+
+    def __init__(self, ctx, camera, width, height, output_graphics, bvh_strategy="array",
+                 bvh_refit=True, rebuild_threshold=1.3, accumulate=False, max_samples=1024,
+                 target_frame_ms=None, quality="high", defines=None):
+        """
+        Con bvh_refit (solo para la estrategia "array") el BVH se reajusta cada frame en lugar
+        de reconstruirse, hasta que su costo SAH supera rebuild_threshold veces el de la construcción.
+
+        Con accumulate cada frame traza una muestra con un desplazamiento distinto dentro del
+        píxel y la promedia con las anteriores; al llegar a max_samples deja de despachar.
+
+        Con target_frame_ms se traza a una resolución interna variable que intenta mantener ese
+        tiempo de dispatch, y el sprite la estira al tamaño de la ventana.
+
+        'quality' elige un preset de QUALITY_PRESETS y 'defines' agrega o pisa defines del shader
+        (ej: {"LOCAL_SIZE_X": 8}); cada combinación se compila una sola vez.
+        """
+        if bvh_strategy not in self.BVH_STRATEGIES:
+            raise ValueError(f"No existe la estrategia de construcción '{bvh_strategy}'. Opciones: {self.BVH_STRATEGIES}")
         self.ctx = ctx
+        self.bvh_strategy = bvh_strategy
+        self.bvh_refit = bvh_refit
+        self.rebuild_threshold = rebuild_threshold
+        self.bvh_nodes = None
         self.width, self.height = width, height
         self.camera = camera
         self.width = width
         self.height = height
-        self.compute_shader = ComputeShaderProgram(self.ctx, "shaders/raytracing.comp")
+        self.quality = None
+        self.defines = {}
+        self.compute_shader = None
         self.output_graphics = output_graphics
+        # Un SSBO persistente por binding (matrices, inversas, materiales, BVH y normales).
+        self.buffers = StorageBufferManager(self.ctx)
 
         self.texture_unit = 0
         self.output_texture = Texture("u_texture", self.width, self.height, 4, None, (255, 255, 255, 255))
         self.output_graphics.update_texture("u_texture", self.output_texture.image_data)
         self.output_graphics.bind_to_image("u_texture", 0, read=False, write=True)
 
-        self.compute_shader.set_uniform('cameraPosition', self.camera.position)
-        self.compute_shader.set_uniform('inverseViewMatrix', self.camera.get_inverse_view_matrix())
-        self.compute_shader.set_uniform('fieldOfView', self.camera.fov)
+        # Suma de las muestras de cada píxel en una imagen float persistente.
+        self.accumulate = accumulate
+        self.max_samples = max_samples
+        self.sample_count = 0
+        self.accumulation_texture = None
+        self.__camera_version = None
+        if self.accumulate:
+            self.__create_accumulation_texture()
+
+        # Resolución dinámica: escala interna ajustada con el tiempo medido de cada dispatch.
+        self.resolution = ResolutionController(target_frame_ms) if target_frame_ms else None
+        self.dispatch_timer = DispatchTimer(self.ctx) if target_frame_ms else None
+        self.render_size = (self.width, self.height)
+
+        # Forma de grupo elegida por autotune; se conserva al cambiar el preset de calidad.
+        self.workgroup_size = None
+        self.set_quality(quality, defines)
 
     def resize(self, width, height):
         self.width, self.height = width, height
         self.output_texture = Texture("u_texture", width, height, 4, None, (255, 255, 255, 255))
         self.output_graphics.update_texture("u_texture", self.output_texture.image_data)
+        if self.accumulate:
+            self.__create_accumulation_texture()
 
-    def matrix_to_ssbo(self, matrix, binding = 0):
-        buffer = self.ctx.buffer(matrix.tobytes())
-        buffer.bind_to_storage_buffer(binding=binding)  
+    def __create_accumulation_texture(self):
+        if self.accumulation_texture is not None:
+            self.accumulation_texture.release()
+        self.accumulation_texture = self.ctx.texture((self.width, self.height), 4, dtype='f4')
+        self.accumulation_texture.bind_to_image(1, read=True, write=True)
+        self.reset_accumulation()
 
-    def primitive_to_ssbo(self, primitives, binding = 3):
-        self.bvh_nodes = BVH(primitives)
-        self.bvh_ssbo = self.bvh_nodes.pack_to_bytes()
-        buf_bvh = self.ctx.buffer(self.bvh_ssbo)
-        buf_bvh.bind_to_storage_buffer(binding=binding)
+    def set_quality(self, quality, defines=None):
+        """Cambia el preset de calidad (y defines extra) usando la caché de programas compilados."""
+        if quality not in self.QUALITY_PRESETS:
+            raise ValueError(f"No existe el preset de calidad '{quality}'. Opciones: {tuple(self.QUALITY_PRESETS)}")
+        self.quality = quality
+        tuned = {}
+        if self.workgroup_size is not None:
+            tuned = {"LOCAL_SIZE_X": self.workgroup_size[0], "LOCAL_SIZE_Y": self.workgroup_size[1]}
+        self.set_defines({**self.QUALITY_PRESETS[quality], **tuned, **(defines or {})})
 
-    def run(self):
-        groups_x = (self.width + 15) // 16
-        groups_y = (self.height + 15) // 16
+    def set_defines(self, defines):
+        """Usa la variante del compute shader compilada con estos defines."""
+        self.defines = dict(defines)
+        shader = get_compute_shader(self.ctx, self.SHADER_PATH, self.defines)
+        if shader is self.compute_shader:
+            return
+        self.compute_shader = shader
+        # Cada programa guarda sus propios uniforms: hay que volver a subir los de la cámara.
+        self.__camera_version = None
+        self.__update_camera()
+        self.reset_accumulation()
 
+    def reset_accumulation(self):
+        """Descarta las muestras acumuladas; la próxima se vuelve a tomar en el centro del píxel."""
+        self.sample_count = 0
+
+    def __update_camera(self):
+        """Sube los uniforms de la cámara solo si cambió su versión, y en ese caso reinicia la acumulación."""
+        version = self.camera.version
+        if version == self.__camera_version:
+            return
+        self.__camera_version = version
+        self.compute_shader.set_uniform('cameraPosition', self.camera.position)
+        self.compute_shader.set_uniform('inverseViewMatrix', self.camera.get_inverse_view_matrix())
+        self.compute_shader.set_uniform('fieldOfView', self.camera.fov)
+        self.reset_accumulation()
+
+    def matrix_to_ssbo(self, matrix, binding = 0, rows = None):
+        """
+        Sube la matriz completa, o solo las filas 'rows' si el buffer ya tiene lugar para toda la matriz.
+        """
+        if rows is None or self.buffers.capacity(binding) < matrix.nbytes:
+            self.buffers.upload(binding, matrix)
+        else:
+            self.buffers.write_rows(binding, matrix, rows)
+
+    def primitive_to_ssbo(self, primitives, binding = 3, ids = None):
+        """Construye un BVH con la estrategia elegida; 'ids' es el índice que guarda cada hoja."""
+        with profiler.stage("bvh_build"):
+            self.bvh_nodes = BVH(primitives, self.bvh_strategy)
+            self.bvh_ssbo = self.bvh_nodes.pack_to_bytes()
+            if ids is not None:
+                nodes = np.frombuffer(self.bvh_ssbo, dtype=np.float32).reshape(-1, 8).copy()
+                leaf = nodes[:, 7] >= 0
+                nodes[leaf, 7] = np.asarray(ids)[nodes[leaf, 7].astype(np.int64)]
+                self.bvh_ssbo = nodes.tobytes()
+        self.buffers.upload(binding, self.bvh_ssbo)
+
+    def bounds_to_ssbo(self, aabb_min, aabb_max, binding = 3, changed = None, ids = None):
+        """
+        Igual que primitive_to_ssbo, pero recibe las cajas como arrays (N, 3) y usa PackedBVH.
+        'ids' son las filas que entran en el árbol y 'changed' las que se movieron desde el frame
+        anterior. Mientras el conjunto de ids no cambie, se reajusta el árbol y se suben solo los nodos tocados.
+        """
+        ids = np.arange(len(aabb_min)) if ids is None else np.asarray(ids)
+        can_refit = (self.bvh_refit and isinstance(self.bvh_nodes, PackedBVH)
+                     and np.array_equal(self.bvh_nodes.ids, ids))
+        if can_refit:
+            with profiler.stage("bvh_refit"):
+                touched = self.bvh_nodes.refit(aabb_min, aabb_max, changed)
+            if self.bvh_nodes.degradation() <= self.rebuild_threshold:
+                self.buffers.write_rows(binding, self.bvh_nodes.nodes, touched)
+                return
+        with profiler.stage("bvh_build"):
+            self.bvh_nodes = PackedBVH(aabb_min, aabb_max, ids)
+        self.buffers.upload(binding, self.bvh_nodes.nodes)
+
+    def dispatch(self, render_size=None):
+        """Lanza el compute shader sobre render_size (por defecto, la imagen completa)."""
+        render_width, render_height = render_size or (self.width, self.height)
+        local_x, local_y = self.compute_shader.local_size
+        groups_x = (render_width + local_x - 1) // local_x
+        groups_y = (render_height + local_y - 1) // local_y
+        self.compute_shader.set_uniform('renderSize', (render_width, render_height))
         self.compute_shader.run(groups_x=groups_x, groups_y=groups_y, groups_z=1)
-        self.ctx.clear(0.0, 0.0, 0.0, 1.0)
-        self.output_graphics.render({"u_texture": self.texture_unit})
 
+    def autotune(self, cache_path=WORKGROUP_CACHE, shapes=WORKGROUP_SHAPES, repeat=3):
+        """
+        Elige el tamaño de grupo de trabajo más rápido para este dispositivo y resolución.
+        Si ya se midió antes (según el archivo de caché) se usa directamente sin medir.
+        """
+        key = tuning_key(self.ctx, type(self).__name__, self.width, self.height, self.quality)
+        tuned = load_tuning(cache_path).get(key)
+        if tuned is None:
+            tuned, _ = tune_workgroup(self, shapes, repeat)
+            save_tuning(cache_path, key, tuned)
+        self.workgroup_size = tuple(tuned)
+        self.set_defines({**self.defines, "LOCAL_SIZE_X": tuned[0], "LOCAL_SIZE_Y": tuned[1]})
+        return self.workgroup_size
 
+    def run(self):
+        render_size = (self.width, self.height)
+        if self.resolution is not None:
+            render_size = self.resolution.render_size(self.width, self.height)
+        if render_size != self.render_size:
+            # Las muestras acumuladas eran de otra resolución.
+            self.render_size = render_size
+            self.reset_accumulation()
+        render_width, render_height = render_size
 
+        self.__update_camera()
+        trace = True
+        if self.accumulate:
+            # Con la imagen convergida se vuelve a mostrar sin trazar nada.
+            trace = self.sample_count < self.max_samples
+            if trace:
+                self.sample_count += 1
+                self.compute_shader.set_uniform('sampleCount', self.sample_count)
+                self.compute_shader.set_uniform('pixelOffset', pixel_offset(self.sample_count))
+        else:
+            self.compute_shader.set_uniform('sampleCount', 0)
+            self.compute_shader.set_uniform('pixelOffset', (0.5, 0.5))
+
+        if trace:
+            with profiler.stage("compute_dispatch"):
+                if self.dispatch_timer is not None:
+                    with self.dispatch_timer:
+                        self.dispatch(render_size)
+                    self.resolution.update(self.dispatch_timer.last_ms)
+                else:
+                    self.dispatch(render_size)
+                # dispatch() solo encola el trabajo: con el profiler activo se espera a la GPU
+                # para que la etapa mida la ejecución del shader y no solo el envío.
+                if profiler.enabled:
+                    self.ctx.finish()
+        self.ctx.clear(0.0, 0.0, 0.0, 1.0)
+        # La imagen trazada ocupa solo la esquina de la textura que corresponde a render_size.
+        uv_scale = (render_width / self.width, render_height / self.height)
+        self.output_graphics.render({"u_texture": self.texture_unit, "u_uv_scale": uv_scale})
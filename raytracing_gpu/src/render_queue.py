@@ -0,0 +1,76 @@
+# src/render_queue.py
+
+from profiler import profiler
+
+
+class RenderQueue:
+    """
+    Junta los dibujos de un frame y los ejecuta ordenados por programa de shaders, texturas y
+    profundidad (de adelante hacia atrás para los opacos, que así descartan más fragmentos
+    con el test de profundidad; los transparentes van al final, de atrás hacia adelante).
+    Mientras dibuja recuerda el programa, la textura de cada unidad y el valor de cada uniform,
+    y saltea los cambios que no cambian nada. El estado se olvida al terminar cada frame,
+    porque fuera de la cola otro código (ej: el raytracer) puede tocar las mismas unidades.
+    """
+    def __init__(self):
+        self.__commands = []
+        # Cambios de estado del último flush.
+        self.stats = {"draw_calls": 0, "program_changes": 0, "texture_binds": 0, "uniform_writes": 0,
+                      "skipped_texture_binds": 0, "skipped_uniform_writes": 0}
+
+    def submit(self, graphics, uniforms, depth=0.0, instances=-1, opaque=True):
+        """Encola un dibujo de 'graphics' con sus uniforms; 'depth' es la distancia a la cámara."""
+        program = graphics.shader_program.prog.glo
+        textures = tuple(texture_ctx.glo for _, texture_ctx in graphics.get_textures())
+        key = (0, program, textures, depth) if opaque else (1, -depth, program, textures)
+        self.__commands.append((key, len(self.__commands), graphics, uniforms, instances))
+
+    def __len__(self):
+        return len(self.__commands)
+
+    def flush(self):
+        """Ordena y dibuja los comandos encolados, y vacía la cola."""
+        stats = dict.fromkeys(self.stats, 0)
+        # El número de orden de llegada desempata sin comparar los objetos gráficos.
+        self.__commands.sort(key=lambda command: command[:2])
+
+        current = None
+        units = {}
+        values = {}
+
+        def set_uniform(shader, name, value):
+            if name not in shader.uniforms:
+                return
+            previous = values.get((shader, name))
+            if previous is not None and previous == value:
+                stats["skipped_uniform_writes"] += 1
+                return
+            shader.set_uniform(name, value)
+            values[(shader, name)] = value
+            stats["uniform_writes"] += 1
+
+        with profiler.stage("raster_draw"):
+            for _, _, graphics, uniforms, instances in self.__commands:
+                shader = graphics.shader_program
+                if shader is not current:
+                    current = shader
+                    stats["program_changes"] += 1
+
+                for name, value in uniforms.items():
+                    set_uniform(shader, name, value)
+
+                for unit, (name, texture_ctx) in enumerate(graphics.get_textures()):
+                    if units.get(unit) is texture_ctx:
+                        stats["skipped_texture_binds"] += 1
+                    else:
+                        texture_ctx.use(unit)
+                        units[unit] = texture_ctx
+                        stats["texture_binds"] += 1
+                    set_uniform(shader, name, unit)
+
+                graphics.draw(instances)
+                stats["draw_calls"] += 1
+
+        self.__commands = []
+        self.stats = stats
+        return stats
@@ -0,0 +1,128 @@
+# src/resource_cache.py
+
+import hashlib
+import numpy as np
+
+
+def content_hash(data):
+    """Hash del contenido de un array o bloque de bytes, para reconocer datos idénticos."""
+    if isinstance(data, np.ndarray):
+        data = np.ascontiguousarray(data)
+    return hashlib.sha1(data).hexdigest()
+
+
+class ResourceCache:
+    """
+    Reparte VBOs, IBOs, VAOs y texturas de la GPU entre todos los objetos de un contexto.
+    Los datos idénticos se suben una sola vez; cada pedido suma una referencia y el recurso
+    se libera cuando se devuelve la última con release.
+    """
+    def __init__(self, ctx):
+        self.ctx = ctx
+        # clave -> [recurso, referencias]; y recurso -> clave para poder devolverlo.
+        self.__entries = {}
+        self.__keys = {}
+        self.uploads = 0
+        self.hits = 0
+
+    def __acquire(self, key, create):
+        entry = self.__entries.get(key)
+        if entry is not None:
+            entry[1] += 1
+            self.hits += 1
+            return entry[0]
+        resource = create()
+        self.__entries[key] = [resource, 1]
+        self.__keys[resource] = key
+        self.uploads += 1
+        return resource
+
+    def buffer(self, data, key=None):
+        """
+        Buffer con el contenido de 'data' (array de NumPy o bytes). Con una 'key' propia no se
+        calcula el hash del contenido y 'data' puede ser una función que arma los datos solo
+        si el buffer todavía no existe.
+        """
+        key = ("buffer", content_hash(data) if key is None else key)
+
+        def create():
+            contents = data() if callable(data) else data
+            if isinstance(contents, np.ndarray):
+                contents = np.ascontiguousarray(contents)
+            return self.ctx.buffer(contents)
+        return self.__acquire(key, create)
+
+    def vertex_array(self, program, buffers, index_buffer=None):
+        """VAO para ese programa con buffers (buffer, formato, atributos...) que ya vienen del caché."""
+        key = ("vertex_array", program, tuple(tuple(b) for b in buffers), index_buffer)
+        return self.__acquire(key, lambda: self.ctx.vertex_array(program, list(buffers), index_buffer))
+
+    def texture(self, texture):
+        """Textura de la GPU con los píxeles y la configuración de un Texture."""
+        key = ("texture", texture.size, texture.channels_amount, texture.repeat_x, texture.repeat_y,
+               texture.build_mipmaps, content_hash(texture.image_data.data))
+        return self.__acquire(key, lambda: self.__create_texture(texture))
+
+    def __create_texture(self, texture):
+        texture_ctx = self.ctx.texture(texture.size, texture.channels_amount, texture.get_bytes())
+        if texture.build_mipmaps:
+            texture_ctx.build_mipmaps()
+        texture_ctx.repeat_x = texture.repeat_x
+        texture_ctx.repeat_y = texture.repeat_y
+        return texture_ctx
+
+    def unshare_texture(self, texture_ctx, texture):
+        """
+        Devuelve una textura que se puede modificar sin afectar a otros objetos: la misma si
+        nadie más la usa (y deja de estar en el caché) o una copia propia hecha con 'texture'.
+        """
+        key = self.__keys.get(texture_ctx)
+        if key is None:
+            return texture_ctx
+        entry = self.__entries[key]
+        if entry[1] == 1:
+            del self.__entries[key]
+            del self.__keys[texture_ctx]
+            return texture_ctx
+        entry[1] -= 1
+        return self.__create_texture(texture)
+
+    def release(self, resource):
+        """Devuelve una referencia; los recursos que no salieron del caché se liberan directamente."""
+        key = self.__keys.get(resource)
+        if key is None:
+            resource.release()
+            return
+        entry = self.__entries[key]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self.__entries[key]
+            del self.__keys[resource]
+            resource.release()
+
+    def references(self, resource):
+        key = self.__keys.get(resource)
+        return 0 if key is None else self.__entries[key][1]
+
+    def memory(self):
+        """Bytes aproximados que ocupan en la GPU los buffers y texturas del caché."""
+        total = 0
+        for resource, _ in self.__entries.values():
+            if hasattr(resource, "components"):
+                width, height = resource.size
+                total += width * height * resource.components
+            elif hasattr(resource, "size"):
+                total += resource.size
+        return total
+
+
+# Un caché por contexto de ModernGL.
+_caches = {}
+
+
+def get_resource_cache(ctx):
+    """Devuelve el ResourceCache del contexto, creándolo la primera vez."""
+    cache = _caches.get(ctx)
+    if cache is None:
+        cache = _caches[ctx] = ResourceCache(ctx)
+    return cache
@@ -1,12 +1,17 @@
 # src/scene.py
 
-from graphics import Graphics
+from graphics import Graphics, InstancedGraphics
 from raytracer import RayTracer 
 from raytracer import RayTracerGPU
+from hit import pack_hitboxes, check_hit_batch
+from profiler import profiler
 import glm
 import math
 import numpy as np
 from graphics import ComputeGraphics
+from transform import compose_transforms, transform_aabbs, to_column_major, to_normal_matrix_std430
+from frustum import FrustumCuller, frustum_planes
+from render_queue import RenderQueue
 
 
 class Scene:
@@ -14,113 +19,336 @@ class Scene:
     Contenedor principal que administra los objetos, la cámara, la animación
     y el ciclo de renderizado, siguiendo la estructura exacta de la guía.
     """
-    def __init__(self, ctx, camera):
-        """Inicializa la escena con un contexto de OpenGL y una cámara."""
+    def __init__(self, ctx, camera, culling=True):
+        """
+        Inicializa la escena con un contexto de OpenGL y una cámara.
+        Con 'culling' no se dibujan los objetos cuya caja en el mundo queda fuera del frustum.
+        """
         self.ctx = ctx
         self.camera = camera
         self.objects = []
         self.graphics = {}
         self.time = 0.0
         
-        # Inicializa las matrices de vista y proyección
-        self.view = glm.lookAt(glm.vec3(0, 0, -5), glm.vec3(0), glm.vec3(0, 1, 0))
-        self.projection = glm.perspective(glm.radians(45.0), camera.aspect, 0.1, 100.0)
+        # Las matrices de vista y proyección salen siempre de la cámara.
+        # camera_version es la versión de la cámara con la que se calcularon.
+        self.camera_version = camera.version
+        self.view = camera.get_view_matrix()
+        self.projection = camera.get_perspective_matrix()
+        self.view_projection = self.projection * self.view
+        # Un InstancedGraphics por cada par (tipo de modelo, material) con shader instanciado.
+        self.batches = {}
+        # Objetos que se dibujan de a uno, y caja local de cada uno (se arma al cambiar la lista).
+        self.single_objects = []
+        self.__single_bounds = None
+
+        self.culling = culling
+        self.culler = FrustumCuller()
+        # Los dibujos de cada frame se ordenan y ejecutan juntos al final de render.
+        self.queue = RenderQueue()
+        # Estadísticas del último frame dibujado.
+        self.stats = {"objects": 0, "visible": 0, "culled": 0, "nodes_tested": 0, **self.queue.stats}
 
     def start(self):
         print("Scene Start!")
 
     def add_object(self, model, material):
-        """Añade un objeto a la escena y crea su componente gráfico."""
+        """
+        Añade un objeto a la escena y crea su componente gráfico. Si el shader del material
+        recibe la matriz de modelo por instancia, el objeto se suma al grupo de su mismo tipo
+        de modelo y material, que se dibuja con una sola llamada.
+        """
         self.objects.append(model)
-        self.graphics[model.name] = Graphics(self.ctx, model, material)
-
-    def render(self):
-        self.time += 0.01
+        if InstancedGraphics.INSTANCE_ATTRIBUTE in material.shader_program.attributes:
+            key = (type(model), material)
+            if key not in self.batches:
+                self.batches[key] = InstancedGraphics(self.ctx, model, material)
+            self.batches[key].add_instance(model)
+            self.graphics[model.name] = self.batches[key]
+        else:
+            self.graphics[model.name] = Graphics(self.ctx, model, material)
+            self.single_objects.append(model)
+            self.__single_bounds = None
 
-        self.view = self.camera.get_view_matrix()
-        self.projection = self.camera.get_perspective_matrix()
+    def remove_object(self, model):
+        """Quita un objeto de la escena junto con su componente gráfico."""
+        self.objects.remove(model)
+        graphics = self.graphics.pop(model.name)
+        if isinstance(graphics, InstancedGraphics):
+            graphics.remove_instance(model)
+            if graphics.instances:
+                return
+            self.batches = {key: batch for key, batch in self.batches.items() if batch is not graphics}
+        elif model in self.single_objects:
+            # Las subclases que no dibujan con Scene.render (ej: RaySceneGPU) no llenan esta lista.
+            self.single_objects.remove(model)
+            self.__single_bounds = None
+        graphics.release()
 
+    def update(self):
+        """Avanza la animación de los objetos. No necesita contexto de OpenGL."""
+        self.time += 0.01
         for obj in self.objects:
             if (obj.animated):
                 obj.rotation += glm.vec3(0.8, 0.6, 0.4)
                 obj.position.x += math.sin(self.time) * 0.01
 
+    def render(self):
+        with profiler.stage("animation"):
+            self.update()
+
+        # La vista y la proyección solo se recalculan cuando cambia la cámara.
+        if self.camera.version != self.camera_version:
+            self.camera_version = self.camera.version
+            self.view = self.camera.get_view_matrix()
+            self.projection = self.camera.get_perspective_matrix()
+            self.view_projection = self.projection * self.view
+
+        planes = frustum_planes(self.view_projection) if self.culling else None
+        with profiler.stage("culling"):
+            visible = self.__cull_singles(planes)
+
+        for obj, show in zip(self.single_objects, visible):
+            if not show:
+                continue
             model = obj.get_model_matrix()
-            mvp = self.projection * self.view * model
-            self.graphics[obj.name].render({'Mvp': mvp})
+            mvp = self.view_projection * model
+            # mvp[3][3] es la w en el clip del origen del objeto: su profundidad en la vista.
+            self.queue.submit(self.graphics[obj.name], {'Mvp': mvp}, depth=mvp[3][3])
+
+        for batch in self.batches.values():
+            count = batch.prepare(planes)
+            if count:
+                self.queue.submit(batch, {'ViewProjection': self.view_projection}, instances=count)
+
+        self.stats.update(self.queue.flush())
+        self.__update_stats(planes is not None)
+
+    def __cull_singles(self, planes):
+        """
+        Máscara de los objetos sueltos que hay que dibujar. Solo se descartan los que usan la
+        uniform Mvp: los demás (ej: el sprite del raytracer) se dibujan en espacio de pantalla.
+        """
+        visible = np.ones(len(self.single_objects), dtype=bool)
+        if planes is None:
+            return visible
+
+        if self.__single_bounds is None:
+            rows = np.array([i for i, obj in enumerate(self.single_objects)
+                             if 'Mvp' in self.graphics[obj.name].uniforms], dtype=np.int64)
+            bounds = [self.single_objects[i].local_bounds for i in rows]
+            local_min = np.array([b[0] for b in bounds], dtype=np.float64).reshape(-1, 3)
+            local_max = np.array([b[1] for b in bounds], dtype=np.float64).reshape(-1, 3)
+            self.__single_bounds = (rows, local_min, local_max)
+        rows, local_min, local_max = self.__single_bounds
+
+        cullable = [self.single_objects[i] for i in rows]
+        trs = np.array([(*obj.position, *obj.rotation, *obj.scale) for obj in cullable],
+                       dtype=np.float64).reshape(-1, 9)
+        models, _ = compose_transforms(trs[:, 0:3], trs[:, 3:6], trs[:, 6:9])
+        self.culler.update(*transform_aabbs(models, local_min, local_max))
+        visible[rows] = self.culler.cull(planes)
+        return visible
+
+    def __update_stats(self, culled):
+        cullers = [self.culler] + [batch.culler for batch in self.batches.values()]
+        self.stats["objects"] = len(self.objects)
+        self.stats["culled"] = sum(c.culled for c in cullers) if culled else 0
+        self.stats["nodes_tested"] = sum(c.tested for c in cullers) if culled else 0
+        self.stats["visible"] = self.stats["objects"] - self.stats["culled"]
 
     def on_mouse_click(self, u, v):
-        """Maneja los clics para detectar colisiones."""
+        """
+        Maneja los clics para detectar colisiones. Informa solo el objeto golpeado más cercano
+        a la cámara: los que el rayo cruza detrás de él no se imprimen.
+        """
         ray = self.camera.raycast(u, v)
-        for obj in self.objects:
-            if obj.check_hit(ray.origin, ray.direction):
-                print(f"¡Golpeaste al objeto {obj.name}!")
+        inverse_models, hittable = pack_hitboxes([obj.hitbox for obj in self.objects])
+        hits, _, index = check_hit_batch(np.array([ray.origin]), np.array([ray.direction]),
+                                         inverse_models, hittable)
+        if hits[0]:
+            print(f"¡Golpeaste al objeto {self.objects[index[0]].name}!")
     
     def on_resize(self, width, height):
         """Ajusta la cámara y el viewport al cambiar el tamaño de la ventana."""
         self.camera.aspect = width / height
         self.ctx.viewport = (0, 0, width, height)
-        # Actualiza la matriz de proyección con el nuevo aspect ratio
-        self.projection = glm.perspective(glm.radians(45.0), self.camera.aspect, 0.1, 100.0)
+        # La proyección se recalcula en el próximo render porque cambiar el aspect sube camera.version.
 
 
 class RayScene(Scene):
-    def __init__(self, ctx, camera, width, height):
+    def __init__(self, ctx, camera, width, height, workers=0, progressive=False, tiles_per_frame=4):
         super().__init__(ctx, camera)
-        self.raytracer = RayTracer(camera, width, height)
+        self.raytracer = RayTracer(camera, width, height, workers)
+        self.progressive = progressive
+        self.tiles_per_frame = tiles_per_frame
+        self.__pending_tiles = []
+        self.__snapshot = None
 
     def start(self):
+        if self.progressive:
+            self.start_progressive()
+            return
+
         print("RayScene: Renderizando frame en CPU... (puede tardar)")
         self.raytracer.render_frame(self.objects)
         if "Sprite" in self.graphics:
             self.graphics["Sprite"].update_texture("u_texture", self.raytracer.get_texture())
         print("RayScene: Renderizado completo.")
 
+    def start_progressive(self):
+        """
+        Muestra una vista previa de baja resolución y deja en cola los tiles del frame,
+        que se irán trazando de a poco en cada llamada a render.
+        """
+        print("RayScene: Renderizado progresivo en CPU...")
+        # Las transformaciones se fijan al empezar para que todos los tiles vean la misma escena.
+        self.__snapshot = pack_hitboxes([obj.hitbox for obj in self.objects])
+        self.__pending_tiles = list(self.raytracer.tiles())
+        self.__pending_tiles.reverse()
+
+        self.raytracer.render_preview(self.objects)
+        if "Sprite" in self.graphics:
+            self.graphics["Sprite"].update_texture("u_texture", self.raytracer.get_texture())
+
+    def refine(self):
+        """Traza los siguientes tiles pendientes y sube a la GPU solo las regiones terminadas."""
+        for _ in range(min(self.tiles_per_frame, len(self.__pending_tiles))):
+            tile = self.__pending_tiles.pop()
+            self.raytracer.render_tile(tile, *self.__snapshot)
+            if "Sprite" in self.graphics:
+                self.graphics["Sprite"].update_texture("u_texture", self.raytracer.get_texture(), region=tile)
+
+        if not self.__pending_tiles:
+            self.__snapshot = None
+            print("RayScene: Renderizado completo.")
+
     def render(self):
+        if self.__pending_tiles:
+            self.refine()
         # Delega a la clase padre para dibujar el Quad y animar los cubos.
         super().render()
 
     def on_resize(self, width, height):
         # Re-renderiza la escena en la CPU si la ventana cambia de tamaño.
         super().on_resize(width, height)
-        self.raytracer = RayTracer(self.camera, width, height)
+        self.raytracer.close()
+        self.raytracer = RayTracer(self.camera, width, height, self.raytracer.workers)
         self.start()
 
 class RaySceneGPU(Scene):
-    def __init__(self, ctx, camera, width, height, output_model, output_material):
+    def __init__(self, ctx, camera, width, height, output_model, output_material, bvh_strategy="array",
+                 bvh_refit=True, accumulate=False, target_frame_ms=None, quality="high", autotune=False):
         self.ctx = ctx
         self.camera = camera
         self.width = width
         self.height = height
         self.raytracer = None
+        # Con autotune se elige la forma de grupo del compute shader al empezar (ver RayTracerGPU.autotune).
+        self.autotune = autotune
 
         self.output_graphics = Graphics(ctx, output_model, output_material)
-        self.raytracer = RayTracerGPU(self.ctx, self.camera, self.width, self.height, self.output_graphics)
+        self.raytracer = RayTracerGPU(self.ctx, self.camera, self.width, self.height, self.output_graphics,
+                                     bvh_strategy, bvh_refit, accumulate=accumulate,
+                                     target_frame_ms=target_frame_ms, quality=quality)
 
         super().__init__(self.ctx, self.camera)
 
+        # Cada objeto ocupa un slot fijo: su fila en las matrices y el índice que guardan las hojas del BVH.
+        self.primitives = []
+        self.slots = {}
+        self.free_slots = []
+        self.active_slots = np.empty(0, dtype=np.int64)
+        self.dirty_slots = set()
+        self.changed = np.empty(0, dtype=np.int64)
+        self.full_upload = True
+        self.models_f = np.zeros((0,16), dtype='f4')
+        self.inv_f = np.zeros((0,16), dtype='f4')
+        # Matrices normales como mat3 de std430 (tres columnas de vec4).
+        self.normals_f = np.zeros((0,12), dtype='f4')
+        self.mats_f = np.zeros((0,4), dtype='f4')
+        self.aabb_min_f = np.zeros((0,3), dtype='f4')
+        self.aabb_max_f = np.zeros((0,3), dtype='f4')
+        # Caja local de cada slot y su posición, rotación y escala en el último frame (NaN = recalcular).
+        self.local_min_f = np.zeros((0,3), dtype='f4')
+        self.local_max_f = np.zeros((0,3), dtype='f4')
+        self.trs_f = np.zeros((0,9))
+        # Slot de cada elemento de self.objects, en el mismo orden.
+        self.object_slots = np.empty(0, dtype=np.int64)
+
     def add_object(self, model, material):
+        """Añade el objeto en un slot libre (o uno nuevo al final); el slot no cambia mientras siga en la escena."""
         self.objects.append(model)
         self.graphics[model.name] = ComputeGraphics(self.ctx, model, material)
 
+        slot = self.free_slots.pop() if self.free_slots else len(self.slots)
+        self.slots[model.name] = slot
+        self.__reserve_slots(slot + 1)
+        self.local_min_f[slot], self.local_max_f[slot] = model.local_bounds
+        self.trs_f[slot] = np.nan
+        self.dirty_slots.add(slot)
+        self.__update_slot_lists()
+
+    def remove_object(self, model):
+        """Quita el objeto y deja su slot en la lista libre para el próximo add_object."""
+        super().remove_object(model)
+        slot = self.slots.pop(model.name)
+        self.free_slots.append(slot)
+        self.dirty_slots.discard(slot)
+        self.__update_slot_lists()
+        self.raytracer.reset_accumulation()
+
+    def mark_dirty(self, model):
+        """Fuerza a subir de nuevo los datos del objeto, ej: después de cambiar su material."""
+        slot = self.slots[model.name]
+        self.trs_f[slot] = np.nan
+        self.dirty_slots.add(slot)
+
+    def __update_slot_lists(self):
+        self.active_slots = np.array(sorted(self.slots.values()), dtype=np.int64)
+        self.object_slots = np.array([self.slots[obj.name] for obj in self.objects], dtype=np.int64)
+
+    def __reserve_slots(self, count):
+        """Agranda los arrays por slot de forma geométrica, conservando las filas existentes."""
+        capacity = len(self.models_f)
+        if count <= capacity:
+            return
+        capacity = max(count, 2 * capacity)
+
+        def grow(array, fill=0):
+            grown = np.full((capacity, *array.shape[1:]), fill, dtype=array.dtype)
+            grown[:len(array)] = array
+            return grown
+
+        self.models_f = grow(self.models_f)
+        self.inv_f = grow(self.inv_f)
+        self.normals_f = grow(self.normals_f)
+        self.mats_f = grow(self.mats_f)
+        self.aabb_min_f = grow(self.aabb_min_f)
+        self.aabb_max_f = grow(self.aabb_max_f)
+        self.local_min_f = grow(self.local_min_f)
+        self.local_max_f = grow(self.local_max_f)
+        self.trs_f = grow(self.trs_f, np.nan)
+
     def start(self):
         print("Start Raytracing!")
-        self.primitives = []
-        n = len(self.objects)
-        self.models_f = np.zeros((n,16), dtype='f4')
-        self.inv_f = np.zeros((n,16), dtype='f4')
-        self.mats_f = np.zeros((n,4), dtype='f4')
+        # Al empezar se recalcula y se sube todo.
+        self.trs_f[:] = np.nan
+        self.dirty_slots.update(self.slots.values())
+        self.full_upload = True
 
         self._update_matrix()
 
         self._matrix_to_ssbo()
 
+        # Se mide con la escena ya subida para que el dispatch trace los objetos reales.
+        if self.autotune:
+            shape = self.raytracer.autotune()
+            print(f"Grupo de trabajo: {shape[0]}x{shape[1]}")
+
     def render(self):
-        self.time += 0.01
-        for obj in self.objects:
-            if obj.animated:
-                obj.rotation += glm.vec3(0.8, 0.6, 0.4)
-                obj.position.x += math.sin(self.time) * 0.01
+        with profiler.stage("animation"):
+            self.update()
 
         if(self.raytracer is not None):
             self._update_matrix()
@@ -133,16 +361,53 @@ class RaySceneGPU(Scene):
         self.camera.aspect = width / height
 
     def _update_matrix(self):
-        self.primitives = []
+        with profiler.stage("update_matrix"):
+            self.__update_matrix()
+
+    def __update_matrix(self):
+        """
+        Junta la posición, rotación y escala de todos los objetos en un array (N, 9) y, solo para
+        las filas que cambiaron, calcula matrices, inversas y AABBs en lote con NumPy y las
+        escribe directamente en los arrays que se suben a los SSBOs.
+        """
+        trs = np.array([(*obj.position, *obj.rotation, *obj.scale) for obj in self.objects],
+                       dtype=np.float64).reshape(-1, 9)
+        moved = (trs != self.trs_f[self.object_slots]).any(axis=1)
+        slots = self.object_slots[moved]
+
+        if len(slots):
+            self.trs_f[slots] = trs[moved]
+            models, inverses = compose_transforms(trs[moved, 0:3], trs[moved, 3:6], trs[moved, 6:9])
+            self.models_f[slots] = to_column_major(models)
+            self.inv_f[slots] = to_column_major(inverses)
+            self.normals_f[slots] = to_normal_matrix_std430(inverses)
+            self.aabb_min_f[slots], self.aabb_max_f[slots] = transform_aabbs(
+                models, self.local_min_f[slots], self.local_max_f[slots])
 
-        for i, (name, graphics) in enumerate(self.graphics.items()):
-            graphics.create_primitive(self.primitives)
-            graphics.create_transformation_matrix(self.models_f, i)
-            graphics.create_inverse_transformation_matrix(self.inv_f, i)
-            graphics.create_material_matrix(self.mats_f, i)
+        # Los materiales solo se escriben para los objetos nuevos o marcados como sucios.
+        if self.dirty_slots:
+            for obj, slot in zip(self.objects, self.object_slots):
+                if slot in self.dirty_slots:
+                    self.graphics[obj.name].create_material_matrix(self.mats_f, slot)
+            self.dirty_slots.clear()
+
+        self.changed = slots
+        if len(slots):
+            # Las muestras acumuladas ya no corresponden a la escena.
+            self.raytracer.reset_accumulation()
 
     def _matrix_to_ssbo(self):
-        self.raytracer.matrix_to_ssbo(self.models_f, 0)
-        self.raytracer.matrix_to_ssbo(self.inv_f, 1)
-        self.raytracer.matrix_to_ssbo(self.mats_f, 2)
-        self.raytracer.primitive_to_ssbo(self.primitives, 3)
\ No newline at end of file
+        rows = None if self.full_upload else self.changed
+        self.raytracer.matrix_to_ssbo(self.models_f, 0, rows)
+        self.raytracer.matrix_to_ssbo(self.inv_f, 1, rows)
+        self.raytracer.matrix_to_ssbo(self.mats_f, 2, rows)
+        self.raytracer.matrix_to_ssbo(self.normals_f, 4, rows)
+        self.full_upload = False
+
+        if self.raytracer.bvh_strategy == "array":
+            self.raytracer.bounds_to_ssbo(self.aabb_min_f, self.aabb_max_f, 3, self.changed, self.active_slots)
+        else:
+            # Las otras estrategias reconstruyen el árbol completo con una lista de cajas por objeto.
+            self.primitives = [{"aabb_min": self.aabb_min_f[slot], "aabb_max": self.aabb_max_f[slot]}
+                               for slot in self.active_slots]
+            self.raytracer.primitive_to_ssbo(self.primitives, 3, self.active_slots)
@@ -1,5 +1,7 @@
 # src/shader_program.py
 
+import hashlib
+import re
 from moderngl import Attribute, Uniform
 import glm
 
@@ -52,11 +54,48 @@ class ShaderProgram:
                 uniform.value = value
 
 
+def preprocess(source, defines):
+    """
+    Inserta una línea '#define NOMBRE VALOR' por cada define justo después de '#version'.
+    Los booleanos se escriben como 1 o 0 para poder usarlos con #if.
+    """
+    lines = []
+    for name, value in sorted(defines.items()):
+        if isinstance(value, bool):
+            value = int(value)
+        lines.append(f"#define {name} {value}")
+    if not lines:
+        return source
+
+    version, newline, rest = source.partition("\n")
+    if not version.startswith("#version"):
+        return "\n".join(lines) + "\n" + source
+    return version + newline + "\n".join(lines) + "\n" + rest
+
+
+def define_value(source, name, default=None):
+    """Devuelve el valor del primer '#define NOMBRE' del código, o 'default' si no hay."""
+    match = re.search(rf"^\s*#define\s+{name}\s+(\S+)", source, re.MULTILINE)
+    return match.group(1) if match else default
+
+
 class ComputeShaderProgram:
-    def __init__(self, ctx, compute_shader_path):
-        with open(compute_shader_path) as file:
-            compute_source = file.read()
-        self.prog = ctx.compute_shader(compute_source)
+    """
+    Compute shader compilado a partir de un archivo y un conjunto de #define.
+    Usar get_compute_shader para reutilizar programas ya compilados.
+    """
+    def __init__(self, ctx, compute_shader_path, defines=None, source=None):
+        if source is None:
+            with open(compute_shader_path) as file:
+                source = file.read()
+        self.path = compute_shader_path
+        self.defines = dict(defines or {})
+        self.source = preprocess(source, self.defines)
+        self.prog = ctx.compute_shader(self.source)
+
+        # Tamaño del grupo de trabajo, para calcular cuántos grupos despachar.
+        self.local_size = (int(define_value(self.source, "LOCAL_SIZE_X", 1)),
+                           int(define_value(self.source, "LOCAL_SIZE_Y", 1)))
 
         uniforms = []
         for name in self.prog:
@@ -75,6 +114,23 @@ class ComputeShaderProgram:
 
     def run(self, groups_x, groups_y, groups_z=1):                                  
         self.prog.run(group_x=groups_x, group_y=groups_y, group_z=groups_z)
-    
 
 
+# Programas compilados por contexto, hash del código fuente y defines.
+_compute_programs = {}
+
+
+def get_compute_shader(ctx, compute_shader_path, defines=None):
+    """
+    Devuelve el ComputeShaderProgram para ese archivo y esos defines, compilándolo solo la
+    primera vez. Como la clave incluye el hash del código, editar el archivo genera otra entrada.
+    """
+    with open(compute_shader_path) as file:
+        source = file.read()
+    defines = dict(defines or {})
+    key = (ctx, hashlib.sha1(source.encode()).hexdigest(), tuple(sorted(defines.items())))
+    program = _compute_programs.get(key)
+    if program is None:
+        program = ComputeShaderProgram(ctx, compute_shader_path, defines, source)
+        _compute_programs[key] = program
+    return program
@@ -0,0 +1,82 @@
+# src/storage_buffer.py
+
+import numpy as np
+from profiler import profiler
+
+
+class StorageBufferManager:
+    """
+    Mantiene un único SSBO por binding y lo reutiliza entre frames.
+    La capacidad crece de forma geométrica y el buffer solo se enlaza cuando se crea,
+    así que en un frame estable no se reserva memoria nueva en la GPU.
+    """
+    def __init__(self, ctx, growth=2.0, orphan=True):
+        """
+        Con 'orphan' cada subida completa descarta el contenido anterior antes de escribir,
+        para que el driver no espere a que la GPU termine de leer el frame previo.
+        """
+        self.ctx = ctx
+        self.growth = growth
+        self.orphan = orphan
+        self.__buffers = {}
+        self.allocations = 0
+
+    def reserve(self, binding, size):
+        """Garantiza que el buffer del binding tenga al menos 'size' bytes y lo devuelve."""
+        buffer = self.__buffers.get(binding)
+        if buffer is not None and buffer.size >= size:
+            return buffer
+
+        capacity = max(size, 16)
+        if buffer is not None:
+            capacity = max(capacity, int(buffer.size * self.growth))
+            buffer.release()
+
+        buffer = self.ctx.buffer(reserve=capacity)
+        buffer.bind_to_storage_buffer(binding=binding)
+        self.__buffers[binding] = buffer
+        self.allocations += 1
+        return buffer
+
+    def upload(self, binding, data):
+        """Reemplaza el contenido del buffer con 'data' (bytes o array de NumPy, sin copiarlo)."""
+        data = np.ascontiguousarray(data) if isinstance(data, np.ndarray) else data
+        with profiler.stage("ssbo_upload"):
+            buffer = self.reserve(binding, data.nbytes if isinstance(data, np.ndarray) else len(data))
+            if self.orphan:
+                buffer.orphan()
+            buffer.write(data)
+
+    def write(self, binding, data, offset=0):
+        """Escribe 'data' en el lugar a partir de 'offset' bytes, sin tocar el resto del buffer."""
+        data = np.ascontiguousarray(data) if isinstance(data, np.ndarray) else data
+        with profiler.stage("ssbo_upload"):
+            self.__buffers[binding].write(data, offset=offset)
+
+    def write_rows(self, binding, array, rows):
+        """
+        Escribe solo las filas 'rows' de 'array' en la misma posición del buffer.
+        Las filas consecutivas se agrupan en una sola escritura.
+        """
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+        if len(rows) == 0:
+            return
+        array = np.ascontiguousarray(array)
+        row_bytes = array.nbytes // len(array)
+        buffer = self.__buffers[binding]
+        with profiler.stage("ssbo_upload"):
+            for run in np.split(rows, np.flatnonzero(np.diff(rows) != 1) + 1):
+                start, end = int(run[0]), int(run[-1]) + 1
+                buffer.write(array[start:end], offset=start * row_bytes)
+
+    def get(self, binding):
+        return self.__buffers.get(binding)
+
+    def capacity(self, binding):
+        buffer = self.__buffers.get(binding)
+        return 0 if buffer is None else buffer.size
+
+    def release(self):
+        for buffer in self.__buffers.values():
+            buffer.release()
+        self.__buffers = {}
@@ -0,0 +1,153 @@
+# src/transform.py
+
+import glm
+import numpy as np
+
+
+class Transform:
+    """
+    Posición, rotación y escala de un objeto, con la matriz de modelo, su inversa y la
+    matriz normal guardadas en caché. Solo se recalculan cuando alguno de los tres valores cambió.
+
+    Es la implementación de referencia de las transformaciones: compose_transforms la replica
+    en lote y tiene que dar las mismas matrices (tests/test_batch.py las compara).
+    """
+    def __init__(self, position=(0, 0, 0), rotation=(0, 0, 0), scale=(1, 1, 1)):
+        self.__position = glm.vec3(*position)
+        self.__rotation = glm.vec3(*rotation)
+        self.__scale = glm.vec3(*scale)
+
+        # Copia de los valores con los que se calcularon las matrices en caché.
+        # Se comparan por valor para detectar también cambios en el lugar (ej: position.x += 1).
+        self.__cached = None
+        self.__model = None
+        self.__inverse = None
+        self.__normal = None
+
+    @property
+    def position(self):
+        return self.__position
+
+    @position.setter
+    def position(self, value):
+        self.__position = glm.vec3(value)
+
+    @property
+    def rotation(self):
+        return self.__rotation
+
+    @rotation.setter
+    def rotation(self, value):
+        self.__rotation = glm.vec3(value)
+
+    @property
+    def scale(self):
+        return self.__scale
+
+    @scale.setter
+    def scale(self, value):
+        self.__scale = glm.vec3(value)
+
+    def is_dirty(self):
+        """Indica si la posición, rotación o escala cambiaron desde el último cálculo."""
+        return self.__cached != (self.__position, self.__rotation, self.__scale)
+
+    def __update(self):
+        if not self.is_dirty():
+            return
+        self.__cached = (glm.vec3(self.__position), glm.vec3(self.__rotation), glm.vec3(self.__scale))
+
+        model = glm.mat4(1)
+        model = glm.translate(model, self.__position)
+        model = glm.rotate(model, glm.radians(self.__rotation.x % 360), glm.vec3(1, 0, 0))
+        model = glm.rotate(model, glm.radians(self.__rotation.y % 360), glm.vec3(0, 1, 0))
+        model = glm.rotate(model, glm.radians(self.__rotation.z % 360), glm.vec3(0, 0, 1))
+        model = glm.scale(model, self.__scale)
+
+        self.__model = model
+        self.__inverse = glm.inverse(model)
+        self.__normal = glm.transpose(glm.mat3(self.__inverse))
+
+    def get_model_matrix(self):
+        self.__update()
+        return self.__model
+
+    def get_inverse_model_matrix(self):
+        self.__update()
+        return self.__inverse
+
+    def get_normal_matrix(self):
+        """Matriz 3x3 para transformar normales: transpuesta de la inversa de la matriz de modelo."""
+        self.__update()
+        return self.__normal
+
+
+def compose_transforms(positions, rotations, scales):
+    """
+    Versión por lotes de Transform para N objetos a la vez, con arrays (N, 3).
+    Devuelve las matrices de modelo y sus inversas como arrays (N, 4, 4) en el orden
+    matemático (fila, columna), con el mismo orden translate * rotX * rotY * rotZ * scale.
+    La inversa se arma directamente: scale^-1 * rotación transpuesta * translate^-1.
+    Transform es la referencia: cualquier cambio en el orden o en las convenciones se hace
+    primero ahí y después acá. La usan Scene (matrices de los SSBOs y culling de los objetos
+    sueltos) e InstancedGraphics, que arman las matrices desde posición, rotación y escala.
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    scales = np.asarray(scales, dtype=np.float64).reshape(-1, 3)
+    angles = np.radians(np.mod(np.asarray(rotations, dtype=np.float64).reshape(-1, 3), 360.0))
+    cos, sin = np.cos(angles), np.sin(angles)
+    n = len(positions)
+
+    def rotation(axis):
+        # Rotación (N, 3, 3) alrededor de un eje, como glm.rotate.
+        a, b = [i for i in range(3) if i != axis]
+        r = np.zeros((n, 3, 3))
+        r[:, axis, axis] = 1.0
+        r[:, a, a] = r[:, b, b] = cos[:, axis]
+        r[:, a, b] = -sin[:, axis]
+        r[:, b, a] = sin[:, axis]
+        return r if axis != 1 else r.transpose(0, 2, 1)
+
+    rotate = rotation(0) @ rotation(1) @ rotation(2)
+
+    models = np.zeros((n, 4, 4))
+    models[:, :3, :3] = rotate * scales[:, None, :]
+    models[:, :3, 3] = positions
+    models[:, 3, 3] = 1.0
+
+    inverses = np.zeros((n, 4, 4))
+    inverses[:, :3, :3] = rotate.transpose(0, 2, 1) / scales[:, :, None]
+    inverses[:, :3, 3] = -np.einsum('nij,nj->ni', inverses[:, :3, :3], positions)
+    inverses[:, 3, 3] = 1.0
+    return models, inverses
+
+
+def transform_aabbs(models, local_min, local_max):
+    """
+    Cajas alineadas a los ejes en el mundo de N cajas locales (arrays (N, 3)) transformadas
+    por matrices (N, 4, 4): centro transformado más la extensión proyectada con |M|.
+    """
+    models = np.asarray(models, dtype=np.float64).reshape(-1, 4, 4)
+    center = (np.asarray(local_min) + np.asarray(local_max)) * 0.5
+    extent = (np.asarray(local_max) - np.asarray(local_min)) * 0.5
+    world_center = np.einsum('nij,nj->ni', models[:, :3, :3], center) + models[:, :3, 3]
+    world_extent = np.einsum('nij,nj->ni', np.abs(models[:, :3, :3]), extent)
+    return world_center - world_extent, world_center + world_extent
+
+
+def to_column_major(matrices):
+    """Aplana matrices (N, 4, 4) al orden por columnas que esperan GLSL y glm: (N, 16) float32."""
+    matrices = np.asarray(matrices)
+    return matrices.transpose(0, 2, 1).reshape(len(matrices), 16).astype(np.float32)
+
+
+def to_normal_matrix_std430(inverses):
+    """
+    Matrices normales (transpuesta de la inversa 3x3) a partir de inversas (N, 4, 4), aplanadas
+    por columnas con el relleno de std430 para un mat3: cada columna ocupa un vec4, (N, 12) float32.
+    """
+    inverses = np.asarray(inverses)
+    padded = np.zeros((len(inverses), 3, 4), dtype=np.float32)
+    # La columna j de la transpuesta es la fila j de la inversa.
+    padded[:, :, :3] = inverses[:, :3, :3]
+    return padded.reshape(len(inverses), 12)
@@ -2,6 +2,7 @@
 
 import pyglet
 import moderngl
+from profiler import profiler
 
 class Window(pyglet.window.Window):
     """
@@ -17,6 +18,10 @@ class Window(pyglet.window.Window):
         
         # Crea el contexto de ModernGL, que es el objeto principal para interactuar con la GPU.
         self.ctx = moderngl.create_context()
+
+        # Habilita el test de profundidad para que los objetos 3D se superpongan correctamente.
+        # Es estado del contexto: basta con hacerlo una vez y no en cada frame.
+        self.ctx.enable(moderngl.DEPTH_TEST)
         
         # Prepara una variable para contener la escena que se va a renderizar.
         self.scene = None
@@ -28,21 +33,20 @@ class Window(pyglet.window.Window):
         """
         self.scene = scene
         self.scene.start()
+        # Lo que se midió al preparar la escena no es parte del primer frame.
+        profiler.end_setup()
 
     def on_draw(self):
         """
         Este es el "corazón" del bucle de renderizado. Pyglet lo llama automáticamente en cada frame.
         """
-        # Limpia los buffers de la ventana (color y profundidad).
-        self.clear()
-        self.ctx.clear(0.08, 0.16, 0.18) # Limpia con un color de fondo oscuro.
-        
-        # Habilita el test de profundidad para que los objetos 3D se superpongan correctamente.
-        self.ctx.enable(moderngl.DEPTH_TEST)
-        
+        # Limpia los buffers de la ventana (color y profundidad) con un color de fondo oscuro.
+        self.ctx.clear(0.08, 0.16, 0.18)
+
         # Si hay una escena cargada, le ordena que se renderice.
         if self.scene:
             self.scene.render()
+        profiler.end_frame()
 
     def on_mouse_press(self, x, y, button, modifiers):
         """
@@ -0,0 +1,78 @@
+# src/workgroup_tuner.py
+
+import json
+import os
+import statistics
+import time
+
+
+# Formas de grupo de trabajo que se prueban (local_size_x, local_size_y).
+WORKGROUP_SHAPES = ((8, 8), (16, 8), (8, 16), (16, 16), (32, 8), (8, 32), (32, 16), (64, 4))
+
+# Archivo donde se guarda la forma elegida para cada raytracer, dispositivo y resolución.
+WORKGROUP_CACHE = "workgroup_tuning.json"
+
+
+def device_string(ctx):
+    """Identifica la GPU y el driver del contexto."""
+    info = ctx.info
+    return f"{info.get('GL_VENDOR', '?')} | {info.get('GL_RENDERER', '?')} | {info.get('GL_VERSION', '?')}"
+
+
+def tuning_key(ctx, renderer, width, height, quality=None):
+    """Clave de la caché: raytracer, dispositivo, resolución y preset de calidad."""
+    return f"{renderer} | {device_string(ctx)} | {width}x{height} | {quality}"
+
+
+def load_tuning(path):
+    """Lee la caché de formas elegidas; si no existe o está dañada devuelve un diccionario vacío."""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_tuning(path, key, shape):
+    """Guarda la forma elegida para 'key' conservando el resto de las entradas del archivo."""
+    if not path:
+        return
+    tuning = load_tuning(path)
+    tuning[key] = list(shape)
+    with open(path, "w") as file:
+        json.dump(tuning, file, indent=2, sort_keys=True)
+
+
+def tune_workgroup(raytracer, shapes=WORKGROUP_SHAPES, repeat=3):
+    """
+    Mide cada forma de grupo despachando el compute shader del raytracer a resolución completa
+    y devuelve la más rápida junto con la mediana (ms) de cada una. Cada variante se compila una
+    sola vez gracias a la caché de programas; al terminar el raytracer queda con sus defines originales.
+    """
+    original = dict(raytracer.defines)
+    timings = {}
+    for shape in shapes:
+        try:
+            raytracer.set_defines({**original, "LOCAL_SIZE_X": shape[0], "LOCAL_SIZE_Y": shape[1]})
+        except Exception:
+            # La forma supera los límites del dispositivo (ej: más invocaciones por grupo de las permitidas).
+            continue
+
+        # Un dispatch de calentamiento para que el driver termine de preparar el programa.
+        raytracer.dispatch()
+        raytracer.ctx.finish()
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            raytracer.dispatch()
+            raytracer.ctx.finish()
+            times.append((time.perf_counter() - start) * 1000.0)
+        timings[tuple(shape)] = statistics.median(times)
+
+    raytracer.set_defines(original)
+    if not timings:
+        raise ValueError("Ninguna forma de grupo de trabajo pudo compilarse en este dispositivo.")
+    best = min(timings, key=timings.get)
+    return best, timings
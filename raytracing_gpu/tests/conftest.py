@@ -0,0 +1,61 @@
+# tests/conftest.py
+#
+# Se ejecuta desde la raíz del repositorio o desde raytracing_gpu:
+#
+#     python -m pytest raytracing_gpu/tests
+
+import os
+import sys
+import numpy as np
+import pytest
+
+
+STAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Los módulos de src se importan sin paquete, igual que al correr main.py.
+sys.path.insert(0, os.path.join(STAGE_DIR, "src"))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def stage_dir():
+    """Los shaders se cargan con rutas relativas a raytracing_gpu."""
+    previous = os.getcwd()
+    os.chdir(STAGE_DIR)
+    yield STAGE_DIR
+    os.chdir(previous)
+
+
+@pytest.fixture(scope="session")
+def ctx():
+    """Contexto de OpenGL 4.3 sin ventana (o con EGL); los tests que lo usan se saltean si no hay uno."""
+    moderngl = pytest.importorskip("moderngl")
+    for options in ({}, {"backend": "egl"}):
+        try:
+            context = moderngl.create_standalone_context(require=430, **options)
+            break
+        except Exception:
+            continue
+    else:
+        pytest.skip("No hay un contexto de OpenGL 4.3 disponible.")
+    context.enable(moderngl.DEPTH_TEST)
+    yield context
+    context.release()
+
+
+@pytest.fixture
+def draw(ctx):
+    """Función que dibuja un frame de la escena fuera de pantalla y lo devuelve como array (alto, ancho, 3)."""
+    framebuffers = {}
+
+    def draw(scene, width, height):
+        if (width, height) not in framebuffers:
+            framebuffers[(width, height)] = ctx.simple_framebuffer((width, height))
+        fbo = framebuffers[(width, height)]
+        fbo.use()
+        ctx.clear(0.08, 0.16, 0.18)
+        scene.render()
+        ctx.finish()
+        return np.frombuffer(fbo.read(components=3), dtype=np.uint8).reshape(height, width, 3)
+
+    yield draw
+    for fbo in framebuffers.values():
+        fbo.release()
@@ -0,0 +1,86 @@
+# tests/test_batch.py
+#
+# Las versiones vectorizadas contra sus versiones de a un rayo.
+
+import glm
+import numpy as np
+from camera import Camera
+from cube import Cube
+from hit import pack_hitboxes, check_hit_batch
+from transform import Transform, compose_transforms
+
+
+def random_cubes(count, rng):
+    positions = rng.uniform((-8, -6, -10), (8, 6, 2), size=(count, 3))
+    rotations = rng.uniform(0, 360, size=(count, 3))
+    scales = rng.uniform(0.2, 1.0, size=(count, 3))
+    return [Cube(tuple(p), tuple(r), tuple(s), name=f"Cube{i}")
+            for i, (p, r, s) in enumerate(zip(positions, rotations, scales))]
+
+
+def random_rays(count, rng):
+    origins = rng.uniform((-3, -3, 12), (3, 3, 18), size=(count, 3)).astype(np.float32)
+    directions = (rng.normal(size=(count, 3)) * (0.3, 0.3, 0.1) - (0, 0, 1)).astype(np.float32)
+    return origins, directions
+
+
+def test_check_hit_batch_matches_check_hit():
+    rng = np.random.default_rng(1)
+    cubes = random_cubes(20, rng)
+    cubes[3].hitbox.hittable = False
+    origins, directions = random_rays(300, rng)
+
+    hits, distances, index = check_hit_batch(origins, directions, *pack_hitboxes([c.hitbox for c in cubes]))
+    scalar = np.array([[cube.check_hit(glm.vec3(*o), glm.vec3(*d)) for cube in cubes]
+                       for o, d in zip(origins, directions)])
+
+    assert hits.any() and not hits.all()
+    np.testing.assert_array_equal(hits, scalar.any(axis=1))
+    # La caja elegida es una de las que golpea el rayo, y ninguna otra está más cerca.
+    assert scalar[hits, index[hits]].all()
+    np.testing.assert_array_equal(index[~hits], -1)
+    assert np.isinf(distances[~hits]).all()
+    for ray in np.flatnonzero(hits):
+        for box in np.flatnonzero(scalar[ray]):
+            _, distance = cubes[box].hitbox.check_hit_batch(origins[ray:ray + 1], directions[ray:ray + 1])
+            assert distances[ray] <= distance[0] + 1e-5
+
+
+def test_hitbox_check_hit_batch_matches_check_hit():
+    rng = np.random.default_rng(2)
+    cube = random_cubes(1, rng)[0]
+    cube.position = (0, 0, 5)
+    origins, directions = random_rays(200, rng)
+
+    hits, _ = cube.hitbox.check_hit_batch(origins, directions)
+    scalar = [cube.check_hit(glm.vec3(*o), glm.vec3(*d)) for o, d in zip(origins, directions)]
+    np.testing.assert_array_equal(hits, scalar)
+
+
+def test_raycast_batch_matches_raycast():
+    width, height = 9, 7
+    camera = Camera((1, 2, 15), (0.5, 0, 0), (0, 1, 0), 45, width / height, 0.1, 100.0)
+
+    origins, directions = camera.raycast_batch(width, height)
+    rays = [camera.raycast(x / (width - 1), y / (height - 1)) for y in range(height) for x in range(width)]
+    np.testing.assert_allclose(origins, [list(ray.origin) for ray in rays], atol=1e-6)
+    np.testing.assert_allclose(directions, [list(ray.direction) for ray in rays], atol=1e-6)
+
+    # Un tile devuelve las mismas filas que la imagen completa.
+    tile_origins, tile_directions = camera.raycast_batch(width, height, tile=(2, 1, 6, 4))
+    rows = np.array([y * width + x for y in range(1, 4) for x in range(2, 6)])
+    np.testing.assert_array_equal(tile_origins, origins[rows])
+    np.testing.assert_allclose(tile_directions, directions[rows], atol=1e-6)
+
+
+def test_compose_transforms_matches_glm():
+    rng = np.random.default_rng(3)
+    positions = rng.uniform(-10, 10, size=(50, 3))
+    rotations = rng.uniform(-720, 720, size=(50, 3))
+    scales = rng.uniform(0.1, 3.0, size=(50, 3))
+
+    models, inverses = compose_transforms(positions, rotations, scales)
+    for model, inverse, p, r, s in zip(models, inverses, positions, rotations, scales):
+        transform = Transform(tuple(p), tuple(r), tuple(s))
+        np.testing.assert_allclose(model, np.array(transform.get_model_matrix()), atol=1e-4)
+        np.testing.assert_allclose(inverse, np.array(glm.inverse(transform.get_model_matrix())), atol=1e-4)
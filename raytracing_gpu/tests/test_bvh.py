@@ -0,0 +1,90 @@
+# tests/test_bvh.py
+
+import numpy as np
+import pytest
+from benchmark import random_primitives
+from bvh import BVH, PackedBVH
+
+
+def preorder(nodes, index=0):
+    """Nodos empaquetados (N, 8) recorridos en preorden como filas [min.xyz, max.xyz, id]; id = -1 si es interno."""
+    node = nodes[index]
+    if node[3] < 0:
+        return [[*node[0:3], *node[4:7], node[7]]]
+    left, right = int(node[3]), int(-node[7] - 2)
+    return [[*node[0:3], *node[4:7], -1]] + preorder(nodes, left) + preorder(nodes, right)
+
+
+def boxes(primitives):
+    aabb_min = np.array([p["aabb_min"].to_list() for p in primitives], dtype=np.float32)
+    aabb_max = np.array([p["aabb_max"].to_list() for p in primitives], dtype=np.float32)
+    return aabb_min, aabb_max
+
+
+@pytest.mark.parametrize("count", [1, 2, 7, 300])
+def test_packed_bvh_matches_build_median(count):
+    primitives = random_primitives(count, np.random.default_rng(count))
+    median = np.frombuffer(BVH(primitives, "median").pack_to_bytes(), dtype=np.float32).reshape(-1, 8)
+    packed = PackedBVH(*boxes(primitives))
+
+    # Los nodos se numeran distinto (en profundidad y por nivel), pero el árbol es el mismo.
+    np.testing.assert_allclose(preorder(packed.nodes), preorder(median), rtol=1e-6)
+    assert packed.sah_cost() == pytest.approx(BVH(primitives, "median").sah_cost())
+
+
+def test_packed_bvh_ids_are_stored_in_leaves():
+    primitives = random_primitives(40, np.random.default_rng(4))
+    ids = np.arange(0, 80, 2)
+    aabb_min, aabb_max = boxes(primitives)
+    spread_min = np.zeros((80, 3), dtype=np.float32)
+    spread_max = np.zeros((80, 3), dtype=np.float32)
+    spread_min[ids], spread_max[ids] = aabb_min, aabb_max
+
+    packed = PackedBVH(spread_min, spread_max, ids)
+    leaves = packed.nodes[packed.nodes[:, 3] < 0]
+    assert sorted(leaves[:, 7].astype(int)) == ids.tolist()
+    for leaf in leaves:
+        np.testing.assert_array_equal(leaf[0:3], spread_min[int(leaf[7])])
+
+
+def test_sah_build_is_valid_and_cheaper_than_median():
+    primitives = random_primitives(500, np.random.default_rng(5))
+    sah = BVH(primitives, "sah")
+    nodes = np.frombuffer(sah.pack_to_bytes(), dtype=np.float32).reshape(-1, 8)
+    rows = np.array(preorder(nodes))
+
+    assert sorted(rows[rows[:, 6] >= 0, 6].astype(int)) == list(range(500))
+    assert sah.sah_cost() < BVH(primitives, "median").sah_cost()
+
+
+def leaf_ids(nodes, index):
+    """Ids de las primitivas que cuelgan del nodo 'index'."""
+    node = nodes[index]
+    if node[3] < 0:
+        return [int(node[7])]
+    return leaf_ids(nodes, int(node[3])) + leaf_ids(nodes, int(-node[7] - 2))
+
+
+def test_refit_matches_fresh_bounds():
+    primitives = random_primitives(200, np.random.default_rng(6))
+    aabb_min, aabb_max = boxes(primitives)
+    packed = PackedBVH(aabb_min, aabb_max)
+
+    rng = np.random.default_rng(7)
+    moved = rng.choice(200, 20, replace=False)
+    offset = rng.uniform(-20, 20, size=(20, 3)).astype(np.float32)
+    aabb_min[moved] += offset
+    aabb_max[moved] += offset
+    touched = packed.refit(aabb_min, aabb_max, moved)
+
+    # Cada nodo debe cubrir exactamente las cajas actuales de sus primitivas.
+    for index, node in enumerate(packed.nodes):
+        ids = leaf_ids(packed.nodes, index)
+        np.testing.assert_array_equal(node[0:3], aabb_min[ids].min(axis=0))
+        np.testing.assert_array_equal(node[4:7], aabb_max[ids].max(axis=0))
+
+    fresh = PackedBVH(aabb_min, aabb_max)
+    np.testing.assert_array_equal(packed.nodes[0, 0:3], fresh.nodes[0, 0:3])
+    np.testing.assert_array_equal(packed.nodes[0, 4:7], fresh.nodes[0, 4:7])
+    assert packed.degradation() == pytest.approx(packed.sah_cost() / packed.build_cost, rel=1e-3)
+    assert 0 in touched and set(packed.leaf_nodes[moved]) <= set(touched)
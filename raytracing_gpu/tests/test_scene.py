@@ -0,0 +1,127 @@
+# tests/test_scene.py
+#
+# Escenas dibujadas fuera de pantalla; necesitan un contexto de OpenGL 4.3.
+
+import numpy as np
+import pytest
+from benchmark import random_cubes
+from camera import Camera
+from cube import Cube
+from material import Material, StandardMaterial
+from quad import Quad
+from scene import Scene, RaySceneGPU
+from shader_program import ShaderProgram
+from texture import Texture
+
+
+WIDTH, HEIGHT = 96, 64
+
+
+def create_camera():
+    # Mira hacia un costado para que parte de los cubos quede fuera del frustum.
+    return Camera((0, 0, 15), (6, 0, 0), (0, 1, 0), 45, WIDTH / HEIGHT, 0.1, 100.0)
+
+
+def create_material(ctx, vertex_shader='shaders/basic.vert', color=(200, 10, 190)):
+    shader = ShaderProgram(ctx, vertex_shader, 'shaders/basic.frag')
+    return StandardMaterial(shader, Texture("u_texture", 1, 1, 3, None, color))
+
+
+def create_ray_scene(ctx, bvh_strategy="array"):
+    shader_sprite = ShaderProgram(ctx, 'shaders/sprite.vert', 'shaders/sprite.frag')
+    sprite = Quad(name="Sprite", animated=False, hittable=False)
+    sprite_texture = Texture(width=WIDTH, height=HEIGHT, channels_amount=4, color=(255, 255, 255, 255))
+    camera = Camera((0, 0, 15), (0, 0, 0), (0, 1, 0), 45, WIDTH / HEIGHT, 0.1, 100.0)
+    return RaySceneGPU(ctx, camera, WIDTH, HEIGHT, sprite, Material(shader_sprite, textures_data=[sprite_texture]),
+                       bvh_strategy=bvh_strategy)
+
+
+def still_cubes(count, seed):
+    cubes = random_cubes(count, np.random.default_rng(seed))
+    for cube in cubes:
+        cube.animated = False
+    return cubes
+
+
+@pytest.mark.parametrize("vertex_shader", ['shaders/basic.vert', 'shaders/basic_instanced.vert'])
+@pytest.mark.parametrize("count", [20, 200])
+def test_culled_render_matches_unculled(ctx, draw, vertex_shader, count):
+    scene = Scene(ctx, create_camera())
+    material = create_material(ctx, vertex_shader)
+    for cube in still_cubes(count, count):
+        scene.add_object(cube, material)
+
+    scene.culling = False
+    unculled = draw(scene, WIDTH, HEIGHT)
+    scene.culling = True
+    culled = draw(scene, WIDTH, HEIGHT)
+
+    assert scene.stats["culled"] > 0
+    assert scene.stats["visible"] + scene.stats["culled"] == count
+    np.testing.assert_array_equal(culled, unculled)
+
+    for obj in list(scene.objects):
+        scene.remove_object(obj)
+
+
+@pytest.mark.parametrize("bvh_strategy", ["array", "median"])
+def test_ray_scene_remove_and_add_again(ctx, draw, bvh_strategy):
+    scene = create_ray_scene(ctx, bvh_strategy)
+    material = create_material(ctx)
+    cubes = [Cube((-3, 0, 0), (20, 30, 0), name="Left", animated=False),
+             Cube((0, 0, 0), (10, 0, 40), name="Middle", animated=False),
+             Cube((3, 0, 0), (0, 45, 0), name="Right", animated=False)]
+    for cube in cubes:
+        scene.add_object(cube, material)
+    scene.start()
+    full = draw(scene, WIDTH, HEIGHT)
+
+    scene.remove_object(cubes[1])
+    without = draw(scene, WIDTH, HEIGHT)
+    assert not np.array_equal(without, full)
+
+    scene.add_object(cubes[1], material)
+    np.testing.assert_array_equal(draw(scene, WIDTH, HEIGHT), full)
+
+
+@pytest.mark.parametrize("bvh_strategy", ["array", "median"])
+def test_ray_scene_reuses_freed_slot(ctx, draw, bvh_strategy):
+    scene = create_ray_scene(ctx, bvh_strategy)
+    shader = ShaderProgram(ctx, 'shaders/basic.vert', 'shaders/basic.frag')
+    cubes = [Cube((-3, 0, 0), name="Left", animated=False),
+             Cube((0, 0, 0), name="Middle", animated=False),
+             Cube((3, 0, 0), name="Right", animated=False)]
+    for cube in cubes:
+        scene.add_object(cube, StandardMaterial(shader, Texture("u_texture", 1, 1, 3, None, (200, 10, 190))))
+    scene.start()
+    draw(scene, WIDTH, HEIGHT)
+
+    slot = scene.slots["Middle"]
+    scene.remove_object(cubes[1])
+    new = Cube((0, 2, -1), (30, 0, 15), (0.5, 1, 0.5), name="New", animated=False)
+    scene.add_object(new, StandardMaterial(shader, Texture("u_texture", 1, 1, 3, None, (0, 0, 255)), reflectivity=0.2))
+    draw(scene, WIDTH, HEIGHT)
+
+    assert scene.slots["New"] == slot
+    assert scene.free_slots == []
+    assert sorted(scene.slots.values()) == [0, 1, 2]
+
+    # Filas que quedaron en los SSBOs: la del slot reusado es del objeto nuevo y las otras no cambiaron.
+    buffers = scene.raytracer.buffers
+    models = np.frombuffer(buffers.get(0).read(), dtype=np.float32).reshape(-1, 16)
+    inverses = np.frombuffer(buffers.get(1).read(), dtype=np.float32).reshape(-1, 16)
+    materials = np.frombuffer(buffers.get(2).read(), dtype=np.float32).reshape(-1, 4)
+    for cube in (cubes[0], new, cubes[2]):
+        row = scene.slots[cube.name]
+        np.testing.assert_allclose(models[row], np.array(cube.get_model_matrix()).T.ravel(), atol=1e-5)
+        np.testing.assert_allclose(inverses[row], np.array(cube.hitbox.inverse_model_matrix).T.ravel(), atol=1e-5)
+    np.testing.assert_allclose(materials[slot], [0, 0, 1, 0.2], atol=1e-6)
+
+    # Las hojas del BVH que ve el shader guardan los slots, y la del slot reusado tiene la caja del objeto nuevo.
+    nodes = np.frombuffer(buffers.get(3).read(), dtype=np.float32).reshape(-1, 8)[:5]
+    leaves = nodes[nodes[:, 3] < 0]
+    assert sorted(leaves[:, 7].astype(int)) == [0, 1, 2]
+    leaf = leaves[leaves[:, 7] == slot][0]
+    aabb_min, aabb_max = new.aabb
+    np.testing.assert_allclose(leaf[0:3], list(aabb_min), atol=1e-5)
+    np.testing.assert_allclose(leaf[4:7], list(aabb_max), atol=1e-5)